@@ -1,9 +1,37 @@
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+import asyncio
+import functools
+import heapq
 import httpx
+import itertools
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 
+from ec2pricing import (
+    EXPORT_FORMATS,
+    CostEstimator,
+    InstanceIndex,
+    InventoryReader,
+    SnapshotStore,
+    export_encodings,
+    get_pricing_details,
+    get_spot_risk,
+    iter_bitmap,
+    parse_number,
+)
+
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
 
 # Add CORS middleware
@@ -16,20 +44,237 @@ app.add_middleware(
 )
 
 # Using ec2instances.info API - a public, accurate, and fast pricing source
-EC2_INSTANCES_API = "https://instances.vantage.sh/instances.json"
+# (override with the EC2_INSTANCES_API environment variable, e.g. for benchmarks)
+EC2_INSTANCES_API = os.environ.get("EC2_INSTANCES_API", "https://instances.vantage.sh/instances.json")
+
+# Versioned catalog snapshots; each request pins the version it first reads
+_snapshots = SnapshotStore()
 
-# Simple in-memory cache
 _cache = {
-    "data": None,
-    "timestamp": None,
-    "ttl": 3600  # Cache for 1 hour
+    "ttl": 3600,  # Refresh the snapshot after 1 hour
+    "refresh": None  # In-flight refresh shared by concurrent requests
+}
+
+_pinned = ContextVar("pinned_snapshots", default=None)
+
+# Prometheus metrics, exposed on /metrics
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by endpoint",
+    ["method", "endpoint", "status"]
+)
+CACHE_REQUESTS = Counter(
+    "pricing_cache_requests_total",
+    "Catalog cache lookups by result (hit, miss, stale)",
+    ["result"]
+)
+CACHE_AGE = Gauge("pricing_cache_age_seconds", "Age of the current catalog snapshot")
+CACHE_AGE.set_function(
+    lambda: (datetime.now() - _snapshots.current.fetched_at).total_seconds() if _snapshots.current else 0
+)
+REFRESH_DURATION = Histogram(
+    "pricing_refresh_duration_seconds",
+    "Time to download and decode the upstream catalog",
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+)
+REFRESH_FAILURES = Counter("pricing_refresh_failures_total", "Failed catalog refreshes")
+REFRESH_PAYLOAD = Gauge("pricing_refresh_payload_bytes", "Size of the last downloaded catalog")
+SNAPSHOT_RECORDS = Gauge("pricing_snapshot_records", "Instance records in the current snapshot")
+SNAPSHOT_VERSION = Gauge("pricing_snapshot_version", "Version of the current snapshot")
+SNAPSHOTS_LIVE = Gauge("pricing_snapshots_live", "Snapshots in memory (current + retired but still pinned)")
+SNAPSHOTS_LIVE.set_function(lambda: len(_snapshots.live))
+INDEX_BUILD_DURATION = Histogram(
+    "pricing_index_build_seconds",
+    "Time to build the lookup index for a catalog"
+)
+EVENT_LOOP_LAG = Gauge("event_loop_lag_seconds", "Scheduling delay of the event loop")
+ESTIMATE_ROWS = Counter(
+    "estimate_rows_total",
+    "Inventory rows processed by /estimate, by result (priced, error)",
+    ["result"]
+)
+
+# Event loop lag sampler, started on the first request
+_loop_monitor = {
+    "task": None,
+    "interval": 1.0
+}
+
+
+async def monitor_event_loop():
+    """Measure how late a fixed sleep wakes up and publish it as event loop lag"""
+    loop = asyncio.get_running_loop()
+    interval = _loop_monitor["interval"]
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - started - interval))
+
+
+# Request profiling: opt in per request with an "X-Profile: 1" header, or
+# sample a fraction of all requests with PROFILE_SAMPLE_RATE (0.0 - 1.0)
+PROFILE_HEADER = b"x-profile"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+
+# Slowest profiled requests, kept as a bounded min-heap of (total, seq, record)
+_slow_requests = {
+    "heap": [],
+    "size": int(os.environ.get("PROFILE_SLOWEST", "20")),
+    "seq": itertools.count()
 }
 
+_profile = ContextVar("profile", default=None)
+
+
+class RequestProfile:
+    """Per-phase timings (seconds) collected while handling one request"""
+
+    def __init__(self):
+        self.phases = {}
+        self.handler_end = None
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def profile_phase(name):
+    """Time a block as a named phase of the current request (no-op unless profiling)"""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - started)
+
+
+def profiled(endpoint):
+    """
+    Mark when an async endpoint returns, so the time until the response is
+    ready can be reported as the encode phase
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            profile = _profile.get()
+            if profile is not None:
+                profile.handler_end = time.perf_counter()
+    return wrapper
+
+
+def record_slow_request(record):
+    """Keep record if it is among the slowest N profiled requests"""
+    entry = (record["total_ms"], next(_slow_requests["seq"]), record)
+    heap = _slow_requests["heap"]
+    if len(heap) < _slow_requests["size"]:
+        heapq.heappush(heap, entry)
+    elif entry[0] > heap[0][0]:
+        heapq.heapreplace(heap, entry)
+
+
+class RequestInstrumentation:
+    """
+    Plain ASGI middleware wrapping every HTTP request:
+    - records per-endpoint latency, labelled by route template
+    - releases the snapshots the request pinned and reports the first one's
+      version in X-Snapshot-Version
+    - for opted-in or sampled requests, reports phase timings in
+      Server-Timing and in the slow-request log
+
+    Headers are added by wrapping send(), so the request body and response
+    stream pass through untouched; an unprofiled request skips the profiling
+    work entirely.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if _loop_monitor["task"] is None or _loop_monitor["task"].done():
+            _loop_monitor["task"] = asyncio.create_task(monitor_event_loop())
+
+        started = time.perf_counter()
+        profile = RequestProfile() if profiling_enabled(scope) else None
+        pins = []
+        status = 500
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = []
+                if pins:
+                    headers.append((b"x-snapshot-version", str(pins[0].version).encode()))
+                if profile is not None:
+                    headers.append((b"server-timing", finish_profile(scope, profile, started, status).encode()))
+                if headers:
+                    message = {**message, "headers": [*message.get("headers", ()), *headers]}
+            await send(message)
+
+        pin_token = _pinned.set(pins)
+        profile_token = _profile.set(profile) if profile is not None else None
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            if profile_token is not None:
+                _profile.reset(profile_token)
+            _pinned.reset(pin_token)
+            for snapshot in pins:
+                snapshot.release()
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                route.path if route else "unmatched",
+                str(status)
+            ).observe(time.perf_counter() - started)
+
+
+def profiling_enabled(scope):
+    """True if the request sent "X-Profile: 1" or was sampled"""
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            if value.decode("latin-1").lower() in ("1", "true", "yes"):
+                return True
+            break
+    return bool(PROFILE_SAMPLE_RATE) and random.random() < PROFILE_SAMPLE_RATE
+
+
+def finish_profile(scope, profile, started, status):
+    """Close a request profile when its response starts; returns the Server-Timing value"""
+    finished = time.perf_counter()
+    if profile.handler_end is not None:
+        profile.add("encode", finished - profile.handler_end)
+    total = finished - started
+
+    record_slow_request({
+        "path": scope["path"],
+        "query": scope.get("query_string", b"").decode("latin-1"),
+        "status": status,
+        "timestamp": datetime.now().isoformat(),
+        "total_ms": round(total * 1000, 3),
+        "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in profile.phases.items()}
+    })
+    return ", ".join(
+        [f"{name};dur={seconds * 1000:.3f}" for name, seconds in profile.phases.items()]
+        + [f"total;dur={total * 1000:.3f}"]
+    )
+
+
+app.add_middleware(RequestInstrumentation)
+
 # Clear cache function for debugging
 def clear_cache():
     """Clear the pricing data cache"""
-    _cache["data"] = None
-    _cache["timestamp"] = None
+    _snapshots.clear()
 
 @app.get("/")
 def root():
@@ -73,223 +318,435 @@ def root():
                 "path": "/get-price-value",
                 "description": "Get only the price value (number only, no JSON) - supports all pricing types",
                 "example": "/get-price-value?instance_type=t3.micro&region=us-east-1&pricing_type=spot&spot_type=avg"
+            },
+            "metrics": {
+                "path": "/metrics",
+                "description": "Prometheus metrics (latency, cache, refresh, event loop lag)"
+            },
+            "estimate": {
+                "path": "/estimate",
+                "description": "POST a CSV/NDJSON inventory (instance_type, region, os, count, hours); streams back per-row costs and totals by region, family and pricing model",
+                "example": "curl --data-binary @fleet.csv '/estimate?pricing_type=reserved&ri_term=1yr'"
+            },
+            "export": {
+                "path": "/export",
+                "description": "Full pricing matrix (on-demand, spot, RI) for every instance/region/OS as CSV (gzip/brotli), Parquet or Arrow",
+                "example": "/export?format=parquet"
+            },
+            "slow_requests": {
+                "path": "/debug/slow-requests",
+                "description": "Slowest profiled requests with per-phase timings (send 'X-Profile: 1' to profile a request)"
             }
         },
         "data_source": "instances.vantage.sh (powered by ec2instances.info)"
     }
 
-async def fetch_all_instance_data(force_refresh=False):
-    """Fetch and cache all EC2 instance data"""
-    
-    # Force refresh if requested
-    if force_refresh:
-        _cache["data"] = None
-        _cache["timestamp"] = None
-    
-    # Check if cache is valid
-    if _cache["data"] and _cache["timestamp"]:
-        age = (datetime.now() - _cache["timestamp"]).seconds
-        if age < _cache["ttl"]:
-            return _cache["data"]
-    
-    # Fetch fresh data
+async def refresh_snapshot():
+    """Download the catalog and publish it as a new snapshot; returns the current snapshot"""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(EC2_INSTANCES_API)
-            if response.status_code == 200:
+        with REFRESH_DURATION.time(), profile_phase("fetch"):
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.get(EC2_INSTANCES_API)
+                if response.status_code != 200:
+                    REFRESH_FAILURES.inc()
+                    logger.warning("Catalog refresh returned HTTP %s", response.status_code)
+                    return _snapshots.current
                 data = response.json()
-                _cache["data"] = data
-                _cache["timestamp"] = datetime.now()
-                return data
-            return []
+        REFRESH_PAYLOAD.set(len(response.content))
+        
+        # Build derived indexes in a worker thread before publishing: other
+        # requests keep being served meanwhile and never see a half-built index
+        snapshot = _snapshots.create(data)
+        with INDEX_BUILD_DURATION.time(), profile_phase("index"):
+            await asyncio.to_thread(lambda: snapshot.index)
+        _snapshots.publish(snapshot)
+        SNAPSHOT_RECORDS.set(len(data))
+        SNAPSHOT_VERSION.set(snapshot.version)
+        return snapshot
     except Exception as e:
-        print(f"Error fetching instance data: {e}")
-        # Return cached data even if expired, if available
-        return _cache["data"] if _cache["data"] else []
+        REFRESH_FAILURES.inc()
+        logger.warning("Error fetching instance data: %s", e)
+        # Keep serving the current snapshot even if expired, if available
+        return _snapshots.current
 
 
-def get_reserved_instance_price(os_pricing, ri_term=None, ri_payment=None, ri_type=None):
-    """
-    Extract Reserved Instance price based on term, payment, and type
+async def current_snapshot(force_refresh=False):
+    """Current snapshot, refreshed first if missing, expired or force_refresh is set"""
+    snapshot = _snapshots.current
     
-    Parameters:
-    - os_pricing: OS pricing dictionary
-    - ri_term: '1yr' or '3yr' (optional)
-    - ri_payment: 'allUpfront', 'partialUpfront', 'noUpfront' (optional)
-    - ri_type: 'Standard', 'Convertible', 'Savings' (optional)
+    with profile_phase("cache"):
+        if snapshot is None:
+            CACHE_REQUESTS.labels("miss").inc()
+        elif force_refresh or (datetime.now() - snapshot.fetched_at).total_seconds() >= _cache["ttl"]:
+            CACHE_REQUESTS.labels("stale").inc()
+        else:
+            CACHE_REQUESTS.labels("hit").inc()
+            return snapshot
     
-    Returns: price value or None
+    # Concurrent requests share one download instead of each starting their own
+    if _cache["refresh"] is None:
+        _cache["refresh"] = asyncio.ensure_future(refresh_snapshot())
+        _cache["refresh"].add_done_callback(lambda _: _cache.update(refresh=None))
+    return await asyncio.shield(_cache["refresh"])
+
+
+async def pin_snapshot(force_refresh=False):
     """
-    reserved = os_pricing.get('reserved', {})
-    
-    if not reserved:
-        return None
+    Snapshot for the current request
     
-    # If no specific parameters, return first available (backward compatibility)
-    if not ri_term and not ri_payment and not ri_type:
-        first_key = list(reserved.keys())[0] if reserved else None
-        return reserved.get(first_key) if first_key else None
-    
-    # Build the key pattern
-    term_map = {'1yr': 'yrTerm1', '3yr': 'yrTerm3'}
-    term_prefix = term_map.get(ri_term, 'yrTerm1')
-    
-    type_map = {'Standard': 'Standard', 'Convertible': 'Convertible', 'Savings': 'Savings'}
-    ri_type_name = type_map.get(ri_type, 'Standard')
-    
-    payment_map = {'allUpfront': 'allUpfront', 'partialUpfront': 'partialUpfront', 'noUpfront': 'noUpfront'}
-    payment = payment_map.get(ri_payment, 'noUpfront')
+    The first call in a request pins a version until the response is sent;
+    later calls in the same request return that same version, so a request
+    never mixes data from before and after a refresh.
+    """
+    pins = _pinned.get()
+    if pins:
+        return pins[0]
+    snapshot = await current_snapshot(force_refresh=force_refresh)
+    if snapshot is not None and pins is not None:
+        pins.append(snapshot.acquire())
+    return snapshot
+
+
+async def fetch_all_instance_data(force_refresh=False):
+    """Fetch and cache all EC2 instance data (the request's pinned snapshot)"""
+    snapshot = await pin_snapshot(force_refresh=force_refresh)
+    return snapshot.instances if snapshot else []
+
+
+async def fetch_instance_index(force_refresh=False):
+    """Fetch the catalog and return the InstanceIndex of the request's pinned snapshot"""
+    snapshot = await pin_snapshot(force_refresh=force_refresh)
+    return snapshot.index if snapshot else InstanceIndex([])
+
+
+def spot_result(instance, os_pricing, price, interruption_rate, effective_price):
+    """Result row for a spot-ranked instance"""
+    vcpus = instance.get('vCPU')
+    memory = instance.get('memory')
+    ondemand = parse_number(os_pricing.get('ondemand'))
+    return {
+        "instance_type": instance.get('instance_type'),
+        "vcpus": vcpus,
+        "memory": memory,
+        "storage": instance.get('storage'),
+        "network": instance.get('network_performance'),
+        "pricing_type": "spot",
+        "price": price,
+        "effective_price": round(effective_price, 6),
+        "interruption_rate": interruption_rate,
+        "ondemand_price": ondemand,
+        "savings_vs_ondemand": parse_number(os_pricing.get('pct_savings_od')),
+        "price_per_vcpu": round(effective_price / vcpus, 4) if vcpus else None,
+        "price_per_gb_memory": round(effective_price / memory, 4) if memory else None,
+        "monthly_price": round(price * 730, 2),  # 730 hours per month
+        "currency": "USD",
+        "unit": "Hrs"
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics in text exposition format"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/debug/slow-requests")
+def slow_requests():
+    """Slowest profiled requests, slowest first"""
+    entries = sorted(_slow_requests["heap"], reverse=True)
+    return {
+        "success": True,
+        "capacity": _slow_requests["size"],
+        "count": len(entries),
+        "requests": [record for _, _, record in entries]
+    }
+
+
+def negotiate_encoding(accept_encoding, available):
+    """Pick the best stored encoding the client accepts: br, then gzip, then identity"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return 'identity'
+
+
+@app.get("/export")
+@profiled
+async def export_catalog(
+    request: Request,
+    export_format: str = Query('csv', alias='format')
+):
+    """
+    Export the full pricing matrix of the current snapshot
     
-    # Try to find exact match
-    key = f"{term_prefix}{ri_type_name}.{payment}"
-    if key in reserved:
-        return reserved[key]
+    One row per instance type, region and OS with on-demand, spot and every
+    Reserved Instance price. Files are generated once per snapshot (each
+    compressed variant the first time a client accepts it) and served from
+    memory, with an ETag for cheap revalidation.
     
-    # Try variations if exact match not found
-    for k, v in reserved.items():
-        if k.startswith(term_prefix) and ri_type_name in k and payment in k:
-            return v
+    Parameters:
+    - format: csv (gzip/brotli via Accept-Encoding), parquet or arrow
+    """
     
-    # Fallback: return first matching term
-    for k, v in reserved.items():
-        if k.startswith(term_prefix):
-            return v
+    try:
+        export_format = export_format.lower()
+        if export_format not in EXPORT_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+            )
+        
+        snapshot = await pin_snapshot()
+        
+        if snapshot is None or not snapshot.instances:
+            raise HTTPException(status_code=503, detail="Unable to fetch pricing data")
+        
+        encoding = negotiate_encoding(request.headers.get('accept-encoding'), export_encodings(export_format))
+        
+        # Built (and compressed for this encoding) in a worker thread the
+        # first time, then served from the snapshot
+        with profile_phase("export"):
+            try:
+                export = await asyncio.to_thread(snapshot.export, export_format, encoding)
+            except ImportError as e:
+                raise HTTPException(status_code=501, detail=str(e))
+        
+        etag = export['etag'] if encoding == 'identity' else f'{export["etag"][:-1]}-{encoding}"'
+        age = (datetime.now() - snapshot.fetched_at).total_seconds()
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={max(0, int(_cache['ttl'] - age))}",
+            "Vary": "Accept-Encoding"
+        }
+        
+        if_none_match = request.headers.get('if-none-match', '')
+        if if_none_match.strip() == '*' or etag in [t.strip().removeprefix('W/') for t in if_none_match.split(',')]:
+            return Response(status_code=304, headers=headers)
+        
+        if encoding != 'identity':
+            headers["Content-Encoding"] = encoding
+        headers["Content-Disposition"] = (
+            f'attachment; filename="ec2-pricing-v{snapshot.version}.{export["extension"]}"'
+        )
+        return Response(content=export['bodies'][encoding], media_type=export['media_type'], headers=headers)
     
-    return None
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
 
+# Longest inventory line /estimate accepts
+MAX_INVENTORY_LINE = 64 * 1024
+# Uploads are kept in memory up to this size, then spilled to a temporary file
+INVENTORY_SPOOL_MEMORY = 1024 * 1024
+# Largest inventory upload /estimate accepts (bytes); larger uploads get 413
+MAX_INVENTORY_BYTES = int(os.environ.get("ESTIMATE_MAX_BYTES", str(50 * 1024 * 1024)))
+# Input lines priced between two writes of the streamed response
+ESTIMATE_BATCH = 1000
+
+INVENTORY_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson"
+}
 
-def get_spot_instance_price(os_pricing, spot_type='avg'):
+
+async def spool_request_body(request):
     """
-    Extract Spot Instance price based on type
-    
-    Parameters:
-    - os_pricing: OS pricing dictionary
-    - spot_type: 'min', 'max', or 'avg' (default: 'avg')
-    
-    Returns: price value or None
+    Copy the request body chunk by chunk into a spooled temporary file, rewound
+
+    Raises HTTPException 413 as soon as the body (or its declared
+    Content-Length) exceeds MAX_INVENTORY_BYTES.
     """
-    spot_map = {
-        'min': 'spot_min',
-        'max': 'spot_max',
-        'avg': 'spot_avg'
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Inventory larger than {MAX_INVENTORY_BYTES} bytes"
+    )
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > MAX_INVENTORY_BYTES:
+        raise too_large
+
+    spool = tempfile.SpooledTemporaryFile(max_size=INVENTORY_SPOOL_MEMORY)
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > MAX_INVENTORY_BYTES:
+                raise too_large
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def iter_spooled_lines(spool):
+    """
+    Decode a spooled upload line by line (UTF-8, optional BOM)
+
+    A line longer than MAX_INVENTORY_LINE is skipped without buffering it
+    and yielded as None, so the caller can report it and carry on.
+    """
+    first = True
+    while True:
+        raw = spool.readline(MAX_INVENTORY_LINE + 1)
+        if not raw:
+            return
+        if len(raw) > MAX_INVENTORY_LINE:
+            while raw and not raw.endswith(b"\n"):
+                raw = spool.readline(MAX_INVENTORY_LINE)
+            yield None
+        else:
+            yield raw.decode("utf-8-sig" if first else "utf-8", errors="replace")
+        first = False
+
+
+def estimate_record(result):
+    """NDJSON record for one priced row"""
+    return {
+        "type": "row",
+        **result,
+        "hourly_cost": round(result["hourly_cost"], 6),
+        "cost": round(result["cost"], 2)
     }
-    
-    spot_key = spot_map.get(spot_type.lower(), 'spot_avg')
-    price = os_pricing.get(spot_key)
-    
-    # Return the price even if it's 0 or empty string (but not None)
-    if price is not None and price != '':
-        return price
-    return None
 
 
-def get_pricing_details(os_pricing, pricing_type, ri_term=None, ri_payment=None, ri_type=None, spot_type='avg'):
+@app.post("/estimate")
+@profiled
+async def estimate_inventory(
+    request: Request,
+    inventory_format: str = Query(None, alias='format'),
+    os_type: str = 'linux',
+    pricing_type: str = 'ondemand',
+    ri_term: str = None,
+    ri_payment: str = None,
+    ri_type: str = None,
+    spot_type: str = 'avg',
+    hours: float = 730,
+    include_rows: bool = True
+):
     """
-    Get pricing details with all options
+    Estimate the cost of an uploaded fleet inventory
     
-    Returns: dict with price and additional info
-    """
-    # Debug: Check what we received
-    if not os_pricing:
-        print(f"get_pricing_details: os_pricing is empty or None")
-        return None
+    The request body is a CSV file (header row required) or NDJSON, one
+    record per line with instance_type, region and optionally os, count
+    (default 1) and hours (default: the hours parameter). Rows may also
+    override pricing_type, ri_term, ri_payment, ri_type and spot_type.
     
-    print(f"get_pricing_details: pricing_type={pricing_type}, os_pricing keys: {list(os_pricing.keys())[:10]}")
+    Rows are priced one at a time against one pinned snapshot and streamed
+    back as NDJSON: one "row" or "error" record per input row, then a
+    "totals" record by region, family and pricing model.
     
-    if pricing_type.lower() == 'ondemand':
-        price = os_pricing.get('ondemand')
-        return {
-            'price': float(price) if price else None,
-            'pricing_info': {
-                'type': 'On-Demand',
-                'description': 'Pay-as-you-go pricing'
-            }
-        }
+    Parameters:
+    - format: csv or ndjson (default: from Content-Type, else detected)
+    - os_type, pricing_type, ri_term, ri_payment, ri_type, spot_type: defaults for rows that omit them
+    - hours: hours per instance for rows without an hours column (default: 730, one month)
+    - include_rows: false to stream only errors and the totals
+    """
     
-    elif pricing_type.lower() == 'reserved':
-        price = get_reserved_instance_price(os_pricing, ri_term, ri_payment, ri_type)
-        if price:
-            return {
-                'price': float(price),
-                'pricing_info': {
-                    'type': 'Reserved Instance',
-                    'term': ri_term or '1yr',
-                    'payment': ri_payment or 'noUpfront',
-                    'ri_type': ri_type or 'Standard',
-                    'description': f'{ri_type or "Standard"} RI - {ri_term or "1yr"} - {ri_payment or "noUpfront"}'
-                },
-                'all_ri_options': os_pricing.get('reserved', {})
-            }
-        return None
-    
-    elif pricing_type.lower() == 'spot':
-        # Try to get spot price - check all possible keys
-        spot_map = {
-            'min': 'spot_min',
-            'max': 'spot_max',
-            'avg': 'spot_avg'
-        }
-        spot_key = spot_map.get(spot_type.lower(), 'spot_avg')
-        
-        # Direct check - if key exists, use it
-        if spot_key in os_pricing:
-            price = os_pricing[spot_key]
-        else:
-            price = os_pricing.get(spot_key)
-        
-        # If requested spot type not found, try to get any available spot price
-        if not price or price == '':
-            # Try spot_avg as fallback
-            if 'spot_avg' in os_pricing:
-                price = os_pricing['spot_avg']
-                spot_type = 'avg'
-            # If still None, try any spot key
-            elif not price or price == '':
-                for key in ['spot_avg', 'spot_min', 'spot_max']:
-                    if key in os_pricing and os_pricing[key]:
-                        price = os_pricing[key]
-                        spot_type = 'avg' if key == 'spot_avg' else ('min' if key == 'spot_min' else 'max')
-                        break
-        
-        # Also get all spot-related data
-        spot_min = os_pricing.get('spot_min')
-        spot_max = os_pricing.get('spot_max')
-        spot_avg = os_pricing.get('spot_avg')
-        pct_savings = os_pricing.get('pct_savings_od')
-        pct_interrupt = os_pricing.get('pct_interrupt')
+    try:
+        if inventory_format is None:
+            content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+            inventory_format = INVENTORY_CONTENT_TYPES.get(content_type)
+        try:
+            reader = InventoryReader(inventory_format.lower() if inventory_format else None)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="format must be one of: csv, ndjson")
+        if hours < 0:
+            raise HTTPException(status_code=400, detail="hours must not be negative")
         
-        # Check if we have any spot pricing data
-        # Debug: print what we found
-        print(f"Spot pricing check - price: {price}, type: {type(price)}, os_pricing keys: {list(os_pricing.keys())[:10]}")
+        snapshot = await pin_snapshot(force_refresh=(pricing_type.lower() == 'spot'))
         
-        if price and price != '':
-            try:
-                # Convert to float - handle both string and numeric values
-                price_float = float(price)
-                return {
-                    'price': price_float,
-                    'pricing_info': {
-                        'type': 'Spot Instance',
-                        'spot_type': spot_type,
-                        'description': f'Spot pricing ({spot_type})'
-                    },
-                    'spot_details': {
-                        'min': float(spot_min) if spot_min and spot_min != '' else None,
-                        'max': float(spot_max) if spot_max and spot_max != '' else None,
-                        'avg': float(spot_avg) if spot_avg and spot_avg != '' else None,
-                        'savings_vs_ondemand': float(pct_savings) if pct_savings and pct_savings != '' else None,
-                        'interruption_rate': float(pct_interrupt) if pct_interrupt and pct_interrupt != '' else None
-                    }
-                }
-            except (ValueError, TypeError) as e:
-                print(f"Error converting spot price to float: {e}, price value: {price}")
-                return None
+        if snapshot is None or not snapshot.instances:
+            raise HTTPException(status_code=503, detail="Unable to fetch pricing data")
         
-        return None
+        estimator = CostEstimator(
+            snapshot,
+            hours=hours,
+            os=os_type,
+            pricing_type=pricing_type,
+            ri_term=ri_term,
+            ri_payment=ri_payment,
+            ri_type=ri_type,
+            spot_type=spot_type
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+    
+    # The upload is read in full before the response starts (the ASGI stack
+    # here cannot read a body while streaming a response), but only into a
+    # spooled file, so memory stays flat whatever the inventory size
+    with profile_phase("upload"):
+        spool = await spool_request_body(request)
+    
+    # The response outlives the request's pin, so the stream holds its own
+    snapshot.acquire()
+    
+    async def records():
+        lines = iter_spooled_lines(spool)
+        truncated = False
+        try:
+            while True:
+                try:
+                    batch = list(itertools.islice(lines, ESTIMATE_BATCH))
+                except (OSError, ValueError) as e:
+                    # The upload could not be read to the end; report what was priced
+                    truncated = True
+                    yield json.dumps({"type": "error", "line": reader.lines + 1, "detail": str(e)}) + "\n"
+                    batch = []
+                if not batch:
+                    break
+                out = []
+                for line in batch:
+                    if line is None:
+                        parsed = reader.skip(f"Line longer than {MAX_INVENTORY_LINE} bytes")
+                    else:
+                        parsed = reader.read(line)
+                    if parsed is None:
+                        continue
+                    result = estimator.add(*parsed)
+                    if isinstance(result, dict):
+                        if include_rows:
+                            out.append(json.dumps(estimate_record(result)))
+                    else:
+                        out.append(json.dumps({"type": "error", "line": result.line, "detail": result.detail}))
+                if out:
+                    yield "\n".join(out) + "\n"
+            yield json.dumps({
+                "type": "totals",
+                "snapshot_version": snapshot.version,
+                "hours_default": hours,
+                "truncated": truncated,
+                **estimator.totals()
+            }) + "\n"
+        finally:
+            ESTIMATE_ROWS.labels("priced").inc(estimator.priced)
+            ESTIMATE_ROWS.labels("error").inc(estimator.errors)
+            spool.close()
+            snapshot.release()
     
-    return None
+    return StreamingResponse(records(), media_type="application/x-ndjson")
+
 
 @app.get("/get-price")
+@profiled
 async def get_aws_price(
     instance_type: str,
     region: str = 'ap-south-1',
@@ -315,88 +772,93 @@ async def get_aws_price(
     """
     
     try:
-        instances = await fetch_all_instance_data(force_refresh=(pricing_type.lower() == 'spot'))
+        index = await fetch_instance_index(force_refresh=(pricing_type.lower() == 'spot'))
         
-        if not instances:
+        if not index.instances:
             raise HTTPException(status_code=503, detail="Unable to fetch pricing data")
         
-        for instance in instances:
-            try:
-                if instance.get('instance_type') == instance_type:
-                    pricing = instance.get('pricing', {})
-                    
-                    if not pricing:
-                        continue
-                    
-                    region_data = pricing.get(region, {})
-                    if not region_data:
-                        return {
-                            "error": f"Instance type '{instance_type}' not available in region '{region}'",
-                            "instance_info": {
-                                "type": instance_type,
-                                "vcpus": instance.get('vCPU'),
-                                "memory": instance.get('memory'),
-                                "available_regions": list(pricing.keys()) if pricing else []
-                            }
-                        }
-                    
-                    os_pricing = region_data.get(os_type.lower(), {})
-                    pricing_details = get_pricing_details(
-                        os_pricing, 
-                        pricing_type, 
-                        ri_term, 
-                        ri_payment, 
-                        ri_type, 
-                        spot_type
-                    )
-                    
-                    if pricing_details and pricing_details.get('price') is not None:
-                        response = {
-                            "success": True,
-                            "instance": instance_type,
-                            "region": region,
-                            "os": os_type,
-                            "pricing_type": pricing_type,
-                            "price": pricing_details['price'],
-                            "currency": "USD",
-                            "unit": "Hrs",
-                            "pricing_info": pricing_details.get('pricing_info', {}),
-                            "specs": {
-                                "vcpus": instance.get('vCPU'),
-                                "memory": instance.get('memory'),
-                                "storage": instance.get('storage'),
-                                "network": instance.get('network_performance'),
-                                "family": instance.get('family'),
-                                "processor": instance.get('physical_processor')
-                            }
-                        }
-                        
-                        # Add additional details for RI and Spot
-                        if pricing_type.lower() == 'reserved' and 'all_ri_options' in pricing_details:
-                            response['all_reserved_options'] = pricing_details['all_ri_options']
-                        
-                        if pricing_type.lower() == 'spot' and 'spot_details' in pricing_details:
-                            response['spot_details'] = pricing_details['spot_details']
-                        
-                        return response
-                    else:
-                        # Instance found but pricing not available
-                        error_msg = f"Pricing type '{pricing_type}' not available for instance '{instance_type}' in region '{region}'"
-                        if pricing_type.lower() == 'spot':
-                            error_msg += ". Spot pricing may not be available for this instance type."
-                        elif pricing_type.lower() == 'reserved':
-                            error_msg += ". Try different RI parameters (ri_term, ri_payment, ri_type)."
-                        return {
-                            "error": error_msg,
-                            "hint": "Check if the instance supports this pricing model in this region"
-                        }
-            except Exception as e:
-                print(f"Error processing instance {instance.get('instance_type', 'unknown')}: {e}")
-                continue
+        corrected_from = None
+        suggestions = []
+        instance = index.get(instance_type)
+        if instance is None:
+            # Answer with the nearest match instead of a bare "not found"
+            instance, suggestions = index.correct(instance_type)
+            if instance is None:
+                return {
+                    "error": f"Instance type '{instance_type}' not found",
+                    "hint": "Make sure the instance type name is correct (e.g., 't3.micro', not 't3micro')",
+                    "suggestions": suggestions
+                }
+            corrected_from = instance_type
+        instance_type = instance.get('instance_type')
+        
+        pricing = instance.get('pricing', {})
+        region_data = pricing.get(region, {})
+        if not region_data:
+            return {
+                "error": f"Instance type '{instance_type}' not available in region '{region}'",
+                "instance_info": {
+                    "type": instance_type,
+                    "vcpus": instance.get('vCPU'),
+                    "memory": instance.get('memory'),
+                    "available_regions": list(pricing.keys()) if pricing else []
+                }
+            }
+        
+        os_pricing = region_data.get(os_type.lower(), {})
+        with profile_phase("price"):
+            pricing_details = get_pricing_details(
+                os_pricing, 
+                pricing_type, 
+                ri_term, 
+                ri_payment, 
+                ri_type, 
+                spot_type
+            )
         
+        if pricing_details and pricing_details.get('price') is not None:
+            response = {
+                "success": True,
+                "instance": instance_type,
+                "region": region,
+                "os": os_type,
+                "pricing_type": pricing_type,
+                "price": pricing_details['price'],
+                "currency": "USD",
+                "unit": "Hrs",
+                "pricing_info": pricing_details.get('pricing_info', {}),
+                "specs": {
+                    "vcpus": instance.get('vCPU'),
+                    "memory": instance.get('memory'),
+                    "storage": instance.get('storage'),
+                    "network": instance.get('network_performance'),
+                    "family": instance.get('family'),
+                    "processor": instance.get('physical_processor')
+                }
+            }
+            
+            if corrected_from:
+                response['corrected_from'] = corrected_from
+                response['suggestions'] = suggestions
+            
+            # Add additional details for RI and Spot
+            if pricing_type.lower() == 'reserved' and 'all_ri_options' in pricing_details:
+                response['all_reserved_options'] = pricing_details['all_ri_options']
+            
+            if pricing_type.lower() == 'spot' and 'spot_details' in pricing_details:
+                response['spot_details'] = pricing_details['spot_details']
+            
+            return response
+        
+        # Instance found but pricing not available
+        error_msg = f"Pricing type '{pricing_type}' not available for instance '{instance_type}' in region '{region}'"
+        if pricing_type.lower() == 'spot':
+            error_msg += ". Spot pricing may not be available for this instance type."
+        elif pricing_type.lower() == 'reserved':
+            error_msg += ". Try different RI parameters (ri_term, ri_payment, ri_type)."
         return {
-            "error": f"Instance type '{instance_type}' not found",
-            "hint": "Make sure the instance type name is correct (e.g., 't3.micro', not 't3micro')"
+            "error": error_msg,
+            "hint": "Check if the instance supports this pricing model in this region"
         }
     
     except HTTPException:
@@ -406,6 +868,7 @@ async def get_aws_price(
 
 
 @app.get("/get-price-value", response_class=PlainTextResponse)
+@profiled
 async def get_aws_price_value(
     instance_type: str,
     region: str = 'ap-south-1',
@@ -433,53 +896,46 @@ async def get_aws_price_value(
     """
     
     try:
-        instances = await fetch_all_instance_data(force_refresh=(pricing_type.lower() == 'spot'))
+        index = await fetch_instance_index(force_refresh=(pricing_type.lower() == 'spot'))
         
-        if not instances:
+        if not index.instances:
             raise HTTPException(status_code=503, detail="Unable to fetch pricing data")
         
-        for instance in instances:
-            try:
-                if instance.get('instance_type') == instance_type:
-                    pricing = instance.get('pricing', {})
-                    
-                    if not pricing:
-                        continue
-                    
-                    region_data = pricing.get(region, {})
-                    if not region_data:
-                        raise HTTPException(
-                            status_code=404,
-                            detail=f"Instance type '{instance_type}' not available in region '{region}'"
-                        )
-                    
-                    os_pricing = region_data.get(os_type.lower(), {})
-                    pricing_details = get_pricing_details(
-                        os_pricing, 
-                        pricing_type, 
-                        ri_term, 
-                        ri_payment, 
-                        ri_type, 
-                        spot_type
-                    )
-                    
-                    if pricing_details and pricing_details.get('price') is not None:
-                        # Return just the price as a string (will be converted to plain text)
-                        return str(pricing_details['price'])
-                    else:
-                        raise HTTPException(
-                            status_code=404,
-                            detail=f"Pricing type '{pricing_type}' not available for this instance"
-                        )
-            except HTTPException:
-                raise
-            except Exception as e:
-                print(f"Error processing instance {instance.get('instance_type', 'unknown')}: {e}")
-                continue
+        instance = index.get(instance_type)
+        if instance is None:
+            # A bare number must never silently belong to a different instance
+            suggestions = index.suggest(instance_type)
+            detail = f"Instance type '{instance_type}' not found"
+            if suggestions:
+                detail += f". Did you mean: {', '.join(suggestions)}?"
+            raise HTTPException(status_code=404, detail=detail)
+        
+        pricing = instance.get('pricing', {})
+        region_data = pricing.get(region, {})
+        if not region_data:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Instance type '{instance_type}' not available in region '{region}'"
+            )
+        
+        os_pricing = region_data.get(os_type.lower(), {})
+        with profile_phase("price"):
+            pricing_details = get_pricing_details(
+                os_pricing, 
+                pricing_type, 
+                ri_term, 
+                ri_payment, 
+                ri_type, 
+                spot_type
+            )
+        
+        if pricing_details and pricing_details.get('price') is not None:
+            # Return just the price as a string (will be converted to plain text)
+            return str(pricing_details['price'])
         
         raise HTTPException(
             status_code=404,
-            detail=f"Instance type '{instance_type}' not found"
+            detail=f"Pricing type '{pricing_type}' not available for this instance"
         )
     
     except HTTPException:
@@ -489,6 +945,7 @@ async def get_aws_price_value(
 
 
 @app.get("/search")
+@profiled
 async def search_instances(
     region: str = 'us-east-1',
     family: str = None,
@@ -498,7 +955,20 @@ async def search_instances(
     max_memory: float = None,
     min_price: float = None,
     max_price: float = None,
+    processor: str = None,
+    arch: str = None,
+    min_network: float = None,
+    has_storage: bool = None,
+    min_gpus: int = None,
+    max_gpus: int = None,
+    max_interrupt: float = None,
+    min_ri_price: float = None,
+    max_ri_price: float = None,
+    ri_term: str = None,
+    ri_payment: str = None,
+    ri_type: str = None,
     os_type: str = 'linux',
+    rank_by: str = None,
     limit: int = 50
 ):
     """
@@ -513,76 +983,95 @@ async def search_instances(
     - max_memory: Maximum memory in GB
     - min_price: Minimum hourly price
     - max_price: Maximum hourly price
+    - processor: Processor name contains (e.g., graviton, xeon, epyc)
+    - arch: Architecture (x86_64, arm64)
+    - min_network: Minimum network performance in Gbps
+    - has_storage: Only instances with (true) or without (false) instance storage
+    - min_gpus: Minimum GPU count
+    - max_gpus: Maximum GPU count
+    - max_interrupt: Maximum spot interruption rate (%)
+    - min_ri_price: Minimum Reserved Instance hourly price
+    - max_ri_price: Maximum Reserved Instance hourly price
+    - ri_term, ri_payment, ri_type: Reserved Instance option used by the RI price filters
     - os_type: Operating system (linux, windows)
+    - rank_by: 'spot' to order results by spot price adjusted for interruption rate
+      (only instances with spot pricing); default is catalog order
     - limit: Maximum number of results (default 50)
     """
     
     try:
-        instances = await fetch_all_instance_data(force_refresh=(pricing_type.lower() == 'spot'))
+        if rank_by and rank_by.lower() != 'spot':
+            raise HTTPException(status_code=400, detail="rank_by must be 'spot' or omitted")
         
-        if not instances:
+        index = await fetch_instance_index()
+        
+        if not index.instances:
             raise HTTPException(status_code=503, detail="Unable to fetch pricing data")
         
+        # Range filters, evaluated as sorted-index lookups and intersected
+        ranges = {}
+        if min_vcpus or max_vcpus:
+            ranges['vcpus'] = (min_vcpus or None, max_vcpus or None)
+        if min_memory or max_memory:
+            ranges['memory'] = (min_memory or None, max_memory or None)
+        if min_price or max_price:
+            ranges['price'] = (min_price or None, max_price or None)
+        if min_network is not None:
+            ranges['network'] = (min_network, None)
+        if min_gpus is not None or max_gpus is not None:
+            ranges['gpus'] = (min_gpus, max_gpus)
+        if max_interrupt is not None:
+            ranges['interrupt'] = (None, max_interrupt)
+        if min_ri_price is not None or max_ri_price is not None:
+            ranges['ri_price'] = (min_ri_price, max_ri_price)
+        
+        with profile_phase("filter"):
+            matches = index.select(
+                region,
+                os_type,
+                family=family,
+                processor=processor,
+                arch=arch,
+                has_storage=has_storage,
+                ranges=ranges,
+                ri_options=(ri_term, ri_payment, ri_type)
+            )
+        
         results = []
         
-        for instance in instances:
-            try:
-                # Apply filters
-                if family and not instance.get('instance_type', '').startswith(family):
-                    continue
-                
-                vcpus = instance.get('vCPU')
-                if vcpus:
-                    if min_vcpus and vcpus < min_vcpus:
-                        continue
-                    if max_vcpus and vcpus > max_vcpus:
-                        continue
-                
-                memory = instance.get('memory')
-                if memory:
-                    if min_memory and memory < min_memory:
-                        continue
-                    if max_memory and memory > max_memory:
-                        continue
-                
-                # Get pricing
-                pricing = instance.get('pricing', {})
-                region_data = pricing.get(region, {})
-                if not region_data:
-                    continue
-                
-                os_pricing = region_data.get(os_type.lower(), {})
-                price = os_pricing.get('ondemand')
-                
-                if price is None:
-                    continue
-                
-                price = float(price)
-                
-                if min_price and price < min_price:
-                    continue
-                if max_price and price > max_price:
-                    continue
-                
-                results.append({
+        if rank_by:
+            # Precomputed spot ranking, restricted to the filter matches
+            ordered = ((position, effective) for effective, position in index.rank_spot(region, os_type, matches))
+        else:
+            ordered = ((position, None) for position in iter_bitmap(matches))
+        
+        with profile_phase("price"):
+            for position, effective_price in ordered:
+                if len(results) >= limit:
+                    break
+            
+                instance = index.instances[position]
+                os_pricing = instance['pricing'][region][os_type.lower()]
+            
+                result = {
                     "instance_type": instance.get('instance_type'),
-                    "vcpus": vcpus,
-                    "memory": memory,
+                    "vcpus": instance.get('vCPU'),
+                    "memory": instance.get('memory'),
                     "storage": instance.get('storage'),
                     "network": instance.get('network_performance'),
                     "family": instance.get('family'),
-                    "price": price,
+                    "price": float(os_pricing['ondemand']),
                     "currency": "USD",
                     "unit": "Hrs"
-                })
-                
-                if len(results) >= limit:
-                    break
-                    
-            except Exception as e:
-                continue
+                }
+                if effective_price is not None:
+                    spot_price, interruption_rate, _ = get_spot_risk(os_pricing)
+                    result["spot_price"] = spot_price
+                    result["effective_spot_price"] = round(effective_price, 6)
+                    result["interruption_rate"] = interruption_rate
+                results.append(result)
         
-        return {
+        response = {
             "success": True,
             "region": region,
             "os": os_type,
@@ -593,11 +1082,26 @@ async def search_instances(
                 "min_memory": min_memory,
                 "max_memory": max_memory,
                 "min_price": min_price,
-                "max_price": max_price
+                "max_price": max_price,
+                "processor": processor,
+                "arch": arch,
+                "min_network": min_network,
+                "has_storage": has_storage,
+                "min_gpus": min_gpus,
+                "max_gpus": max_gpus,
+                "max_interrupt": max_interrupt,
+                "min_ri_price": min_ri_price,
+                "max_ri_price": max_ri_price
             },
+            "rank_by": rank_by.lower() if rank_by else None,
             "count": len(results),
             "instances": results
         }
+        
+        if family and not index.family_bitmap(family):
+            response["suggestions"] = index.suggest_family(family)
+        
+        return response
     
     except HTTPException:
         raise
@@ -606,20 +1110,22 @@ async def search_instances(
 
 
 @app.get("/regions")
+@profiled
 async def list_regions():
     """List all available AWS regions"""
     
     try:
-        instances = await fetch_all_instance_data(force_refresh=(pricing_type.lower() == 'spot'))
+        instances = await fetch_all_instance_data()
         
         if not instances:
             raise HTTPException(status_code=503, detail="Unable to fetch pricing data")
         
-        regions = set()
+        with profile_phase("scan"):
+            regions = set()
         
-        for instance in instances:
-            pricing = instance.get('pricing', {})
-            regions.update(pricing.keys())
+            for instance in instances:
+                pricing = instance.get('pricing', {})
+                regions.update(pricing.keys())
         
         region_list = sorted(list(regions))
         
@@ -634,32 +1140,34 @@ async def list_regions():
 
 
 @app.get("/families")
+@profiled
 async def list_families():
     """List all instance families"""
     
     try:
-        instances = await fetch_all_instance_data(force_refresh=(pricing_type.lower() == 'spot'))
+        instances = await fetch_all_instance_data()
         
         if not instances:
             raise HTTPException(status_code=503, detail="Unable to fetch pricing data")
         
-        families = {}
+        with profile_phase("scan"):
+            families = {}
         
-        for instance in instances:
-            instance_type = instance.get('instance_type', '')
-            family = instance.get('family', instance_type.split('.')[0] if '.' in instance_type else 'unknown')
+            for instance in instances:
+                instance_type = instance.get('instance_type', '')
+                family = instance.get('family', instance_type.split('.')[0] if '.' in instance_type else 'unknown')
             
-            if family not in families:
-                families[family] = {
-                    "family": family,
-                    "description": instance.get('family_description', ''),
-                    "count": 0,
-                    "examples": []
-                }
+                if family not in families:
+                    families[family] = {
+                        "family": family,
+                        "description": instance.get('family_description', ''),
+                        "count": 0,
+                        "examples": []
+                    }
             
-            families[family]['count'] += 1
-            if len(families[family]['examples']) < 3:
-                families[family]['examples'].append(instance_type)
+                families[family]['count'] += 1
+                if len(families[family]['examples']) < 3:
+                    families[family]['examples'].append(instance_type)
         
         return {
             "success": True,
@@ -672,6 +1180,7 @@ async def list_families():
 
 
 @app.get("/compare")
+@profiled
 async def compare_instances(
     instances: str,
     region: str = 'us-east-1',
@@ -696,30 +1205,31 @@ async def compare_instances(
         
         results = []
         
-        for target_type in instance_list:
-            for instance in all_instances:
-                if instance.get('instance_type') == target_type:
-                    pricing = instance.get('pricing', {})
-                    region_data = pricing.get(region, {})
+        with profile_phase("price"):
+            for target_type in instance_list:
+                for instance in all_instances:
+                    if instance.get('instance_type') == target_type:
+                        pricing = instance.get('pricing', {})
+                        region_data = pricing.get(region, {})
                     
-                    if region_data:
-                        os_pricing = region_data.get(os_type.lower(), {})
-                        price = os_pricing.get('ondemand')
+                        if region_data:
+                            os_pricing = region_data.get(os_type.lower(), {})
+                            price = os_pricing.get('ondemand')
                         
-                        if price is not None:
-                            results.append({
-                                "instance_type": target_type,
-                                "vcpus": instance.get('vCPU'),
-                                "memory": instance.get('memory'),
-                                "storage": instance.get('storage'),
-                                "network": instance.get('network_performance'),
-                                "price": float(price),
-                                "price_per_vcpu": round(float(price) / instance.get('vCPU', 1), 4) if instance.get('vCPU') else None,
-                                "price_per_gb_memory": round(float(price) / instance.get('memory', 1), 4) if instance.get('memory') else None,
-                                "currency": "USD",
-                                "unit": "Hrs"
-                            })
-                    break
+                            if price is not None:
+                                results.append({
+                                    "instance_type": target_type,
+                                    "vcpus": instance.get('vCPU'),
+                                    "memory": instance.get('memory'),
+                                    "storage": instance.get('storage'),
+                                    "network": instance.get('network_performance'),
+                                    "price": float(price),
+                                    "price_per_vcpu": round(float(price) / instance.get('vCPU', 1), 4) if instance.get('vCPU') else None,
+                                    "price_per_gb_memory": round(float(price) / instance.get('memory', 1), 4) if instance.get('memory') else None,
+                                    "currency": "USD",
+                                    "unit": "Hrs"
+                                })
+                        break
         
         return {
             "success": True,
@@ -734,12 +1244,14 @@ async def compare_instances(
 
 
 @app.get("/cheapest")
+@profiled
 async def get_cheapest_instances(
     region: str = 'us-east-1',
     min_vcpus: int = 1,
     min_memory: float = 1,
     family: str = None,
     os_type: str = 'linux',
+    rank_by: str = 'ondemand',
     limit: int = 10
 ):
     """
@@ -751,67 +1263,94 @@ async def get_cheapest_instances(
     - min_memory: Minimum memory in GB
     - family: Instance family filter (optional)
     - os_type: Operating system (linux, windows)
+    - rank_by: 'ondemand' (on-demand price) or 'spot' (spot price adjusted for interruption rate)
     - limit: Number of results to return
     """
     
     try:
-        instances = await fetch_all_instance_data(force_refresh=(pricing_type.lower() == 'spot'))
+        if rank_by.lower() not in ('ondemand', 'spot'):
+            raise HTTPException(status_code=400, detail="rank_by must be 'ondemand' or 'spot'")
         
-        if not instances:
+        index = await fetch_instance_index()
+        
+        if not index.instances:
             raise HTTPException(status_code=503, detail="Unable to fetch pricing data")
         
+        # Family filter is a prefix range over the sorted type index
+        candidates = index.with_prefix(family) if family else index.instances
         results = []
         
-        for instance in instances:
-            try:
-                # Apply filters
-                if family and not instance.get('instance_type', '').startswith(family):
-                    continue
-                
-                vcpus = instance.get('vCPU')
-                if not vcpus or vcpus < min_vcpus:
-                    continue
+        if rank_by.lower() == 'spot':
+            with profile_phase("filter"):
+                matches = index.select(
+                    region,
+                    os_type,
+                    family=family,
+                    ranges={'vcpus': (min_vcpus, None), 'memory': (min_memory, None)}
+                )
+            # The ranking is precomputed in effective-price order, so the
+            # first `limit` matches are the answer and no sort is needed
+            with profile_phase("price"):
+                for effective_price, position in index.rank_spot(region, os_type, matches):
+                    instance = index.instances[position]
+                    vcpus = instance.get('vCPU')
+                    memory = instance.get('memory')
+                    if not vcpus or not memory:
+                        continue
+                    os_pricing = instance['pricing'][region][os_type.lower()]
+                    price, interruption_rate, _ = get_spot_risk(os_pricing)
+                    results.append(spot_result(instance, os_pricing, price, interruption_rate, effective_price))
+                    if len(results) >= limit:
+                        break
+        else:
+            with profile_phase("filter"):
+                for instance in candidates:
+                    try:
+                        vcpus = instance.get('vCPU')
+                        if not vcpus or vcpus < min_vcpus:
+                            continue
                 
-                memory = instance.get('memory')
-                if not memory or memory < min_memory:
-                    continue
+                        memory = instance.get('memory')
+                        if not memory or memory < min_memory:
+                            continue
                 
-                # Get pricing
-                pricing = instance.get('pricing', {})
-                region_data = pricing.get(region, {})
-                if not region_data:
-                    continue
+                        # Get pricing
+                        pricing = instance.get('pricing', {})
+                        region_data = pricing.get(region, {})
+                        if not region_data:
+                            continue
                 
-                os_pricing = region_data.get(os_type.lower(), {})
-                price = os_pricing.get('ondemand')
+                        os_pricing = region_data.get(os_type.lower(), {})
+                        price = os_pricing.get('ondemand')
                 
-                if price is None:
-                    continue
+                        if price is None:
+                            continue
                 
-                price = float(price)
+                        price = float(price)
                 
-                results.append({
-                    "instance_type": instance.get('instance_type'),
-                    "vcpus": vcpus,
-                    "memory": memory,
-                    "storage": instance.get('storage'),
-                    "network": instance.get('network_performance'),
-                    "price": price,
-                    "price_per_vcpu": round(price / vcpus, 4),
-                    "price_per_gb_memory": round(price / memory, 4),
-                    "monthly_price": round(price * 730, 2),  # 730 hours per month
-                    "currency": "USD",
-                    "unit": "Hrs"
-                })
+                        results.append({
+                            "instance_type": instance.get('instance_type'),
+                            "vcpus": vcpus,
+                            "memory": memory,
+                            "storage": instance.get('storage'),
+                            "network": instance.get('network_performance'),
+                            "price": price,
+                            "price_per_vcpu": round(price / vcpus, 4),
+                            "price_per_gb_memory": round(price / memory, 4),
+                            "monthly_price": round(price * 730, 2),  # 730 hours per month
+                            "currency": "USD",
+                            "unit": "Hrs"
+                        })
                     
-            except Exception as e:
-                continue
+                    except Exception as e:
+                        continue
         
-        # Sort by price
-        results.sort(key=lambda x: x['price'])
-        results = results[:limit]
+            # Sort by price
+            with profile_phase("sort"):
+                results.sort(key=lambda x: x['price'])
+                results = results[:limit]
         
-        return {
+        response = {
             "success": True,
             "region": region,
             "os": os_type,
@@ -820,15 +1359,24 @@ async def get_cheapest_instances(
                 "min_memory": min_memory,
                 "family": family
             },
+            "rank_by": rank_by.lower(),
             "count": len(results),
             "cheapest_instances": results
         }
+        
+        if family and not candidates:
+            response["suggestions"] = index.suggest_family(family)
+        
+        return response
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
 @app.get("/instances")
+@profiled
 async def list_all_instances(
     region: str = None,
     os_type: str = 'linux',
@@ -844,42 +1392,43 @@ async def list_all_instances(
     """
     
     try:
-        instances = await fetch_all_instance_data(force_refresh=(pricing_type.lower() == 'spot'))
+        instances = await fetch_all_instance_data()
         
         if not instances:
             raise HTTPException(status_code=503, detail="Unable to fetch pricing data")
         
         results = []
         
-        for instance in instances:
-            try:
-                instance_info = {
-                    "instance_type": instance.get('instance_type'),
-                    "family": instance.get('family'),
-                    "vcpus": instance.get('vCPUs'),
-                    "memory": instance.get('memory'),
-                    "storage": instance.get('storage'),
-                    "network": instance.get('network_performance'),
-                    "processor": instance.get('physical_processor')
-                }
+        with profile_phase("price"):
+            for instance in instances:
+                try:
+                    instance_info = {
+                        "instance_type": instance.get('instance_type'),
+                        "family": instance.get('family'),
+                        "vcpus": instance.get('vCPUs'),
+                        "memory": instance.get('memory'),
+                        "storage": instance.get('storage'),
+                        "network": instance.get('network_performance'),
+                        "processor": instance.get('physical_processor')
+                    }
                 
-                if include_pricing and region:
-                    pricing = instance.get('pricing', {})
-                    region_data = pricing.get(region, {})
+                    if include_pricing and region:
+                        pricing = instance.get('pricing', {})
+                        region_data = pricing.get(region, {})
                     
-                    if region_data:
-                        os_pricing = region_data.get(os_type.lower(), {})
-                        price = os_pricing.get('ondemand')
+                        if region_data:
+                            os_pricing = region_data.get(os_type.lower(), {})
+                            price = os_pricing.get('ondemand')
                         
-                        if price is not None:
-                            instance_info['price'] = float(price)
-                            instance_info['currency'] = 'USD'
-                            instance_info['unit'] = 'Hrs'
+                            if price is not None:
+                                instance_info['price'] = float(price)
+                                instance_info['currency'] = 'USD'
+                                instance_info['unit'] = 'Hrs'
                 
-                results.append(instance_info)
+                    results.append(instance_info)
                     
-            except Exception as e:
-                continue
+                except Exception as e:
+                    continue
         
         return {
             "success": True,
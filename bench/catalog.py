@@ -0,0 +1,145 @@
+"""
+Catalog fixtures for the benchmark harness
+
+Builds a synthetic instances.json with the same shape as the
+instances.vantage.sh feed, loads a recorded one, and scales either by
+cloning instance families under new names.
+"""
+
+import json
+import random
+
+FAMILIES = [
+    # (prefix, family, processor, arch, storage, gpus)
+    ('t2', 'General purpose', 'Intel Xeon Family', 'x86_64', False, 0),
+    ('t3', 'General purpose', 'Intel Skylake E5 2686 v5', 'x86_64', False, 0),
+    ('t3a', 'General purpose', 'AMD EPYC 7571', 'x86_64', False, 0),
+    ('t4g', 'General purpose', 'AWS Graviton2 Processor', 'arm64', False, 0),
+    ('m5', 'General purpose', 'Intel Xeon Platinum 8175', 'x86_64', False, 0),
+    ('m5d', 'General purpose', 'Intel Xeon Platinum 8175', 'x86_64', True, 0),
+    ('m6g', 'General purpose', 'AWS Graviton2 Processor', 'arm64', False, 0),
+    ('m6i', 'General purpose', 'Intel Xeon 8375C (Ice Lake)', 'x86_64', False, 0),
+    ('m7g', 'General purpose', 'AWS Graviton3 Processor', 'arm64', False, 0),
+    ('c5', 'Compute optimized', 'Intel Xeon Platinum 8124M', 'x86_64', False, 0),
+    ('c5n', 'Compute optimized', 'Intel Xeon Platinum 8124M', 'x86_64', False, 0),
+    ('c6g', 'Compute optimized', 'AWS Graviton2 Processor', 'arm64', False, 0),
+    ('c7i', 'Compute optimized', 'Intel Xeon Scalable (Sapphire Rapids)', 'x86_64', False, 0),
+    ('r5', 'Memory optimized', 'Intel Xeon Platinum 8175', 'x86_64', False, 0),
+    ('r6g', 'Memory optimized', 'AWS Graviton2 Processor', 'arm64', False, 0),
+    ('r7a', 'Memory optimized', 'AMD EPYC 9R14', 'x86_64', False, 0),
+    ('x2idn', 'Memory optimized', 'Intel Xeon 8375C (Ice Lake)', 'x86_64', True, 0),
+    ('i3', 'Storage optimized', 'Intel Xeon E5-2686 v4', 'x86_64', True, 0),
+    ('i4i', 'Storage optimized', 'Intel Xeon 8375C (Ice Lake)', 'x86_64', True, 0),
+    ('g4dn', 'GPU instance', 'Intel Xeon Family', 'x86_64', True, 1),
+    ('g5', 'GPU instance', 'AMD EPYC 7R32', 'x86_64', True, 1),
+    ('p3', 'GPU instance', 'Intel Xeon E5-2686 v4', 'x86_64', False, 4),
+]
+
+SIZES = [
+    # (size, vcpus, memory multiplier)
+    ('micro', 2, 0.5),
+    ('small', 2, 1),
+    ('medium', 2, 2),
+    ('large', 2, 4),
+    ('xlarge', 4, 4),
+    ('2xlarge', 8, 4),
+    ('4xlarge', 16, 4),
+    ('8xlarge', 32, 4),
+    ('12xlarge', 48, 4),
+    ('16xlarge', 64, 4),
+    ('24xlarge', 96, 4),
+    ('metal', 96, 4),
+]
+
+REGIONS = [
+    'us-east-1', 'us-east-2', 'us-west-1', 'us-west-2',
+    'eu-west-1', 'eu-central-1', 'ap-south-1', 'ap-southeast-1',
+    'ap-northeast-1', 'sa-east-1'
+]
+
+OPERATING_SYSTEMS = {'linux': 1.0, 'windows': 1.8, 'rhel': 1.3, 'sles': 1.25}
+
+NETWORK = ['Low to Moderate', 'Moderate', 'Up to 5 Gigabit', 'Up to 10 Gigabit',
+           'Up to 12.5 Gigabit', '10 Gigabit', '25 Gigabit', '50 Gigabit', '100 Gigabit']
+
+INTERRUPT_BANDS = [2.5, 7.5, 12.5, 17.5, 22.5]
+
+
+def _price(value):
+    return f"{value:.6f}".rstrip('0').rstrip('.')
+
+
+def synthetic_catalog(seed=0, regions=REGIONS, operating_systems=OPERATING_SYSTEMS):
+    """
+    Generate a deterministic catalog shaped like instances.vantage.sh
+
+    Returns: list of instance dicts
+    """
+    rnd = random.Random(seed)
+    instances = []
+
+    for prefix, family, processor, arch, has_storage, gpus in FAMILIES:
+        for size_index, (size, vcpus, memory_ratio) in enumerate(SIZES):
+            memory = vcpus * memory_ratio
+            base = 0.0052 * vcpus * (1 + memory_ratio / 4) * (1 + gpus * 3) * rnd.uniform(0.8, 1.2)
+            pricing = {}
+            for region in regions:
+                region_factor = rnd.uniform(1.0, 1.35)
+                pricing[region] = {}
+                for os_type, os_factor in operating_systems.items():
+                    ondemand = base * region_factor * os_factor
+                    spot = ondemand * rnd.uniform(0.25, 0.45)
+                    pricing[region][os_type] = {
+                        'ondemand': _price(ondemand),
+                        'reserved': {
+                            'yrTerm1Standard.noUpfront': _price(ondemand * 0.63),
+                            'yrTerm1Standard.partialUpfront': _price(ondemand * 0.6),
+                            'yrTerm1Standard.allUpfront': _price(ondemand * 0.58),
+                            'yrTerm3Standard.noUpfront': _price(ondemand * 0.45),
+                            'yrTerm3Standard.partialUpfront': _price(ondemand * 0.41),
+                            'yrTerm3Standard.allUpfront': _price(ondemand * 0.38),
+                            'yrTerm1Convertible.noUpfront': _price(ondemand * 0.72),
+                            'yrTerm3Convertible.allUpfront': _price(ondemand * 0.5),
+                        },
+                        'spot_min': _price(spot * 0.85),
+                        'spot_max': _price(spot * 1.2),
+                        'spot_avg': _price(spot),
+                        'pct_interrupt': str(rnd.choice(INTERRUPT_BANDS)),
+                        'pct_savings_od': str(round((1 - spot / ondemand) * 100)),
+                    }
+
+            instances.append({
+                'instance_type': f'{prefix}.{size}',
+                'family': family,
+                'vCPU': vcpus,
+                'memory': memory,
+                'GPU': gpus,
+                'physical_processor': processor,
+                'arch': [arch],
+                'network_performance': NETWORK[min(size_index, len(NETWORK) - 1)],
+                'storage': {'devices': 1, 'size': 75 * vcpus, 'ssd': True} if has_storage else None,
+                'pricing': pricing,
+            })
+
+    return instances
+
+
+def load_catalog(path):
+    """Load a recorded instances.json"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def scale_catalog(instances, factor):
+    """
+    Grow a catalog factor times by cloning every instance under renamed
+    families (t3.micro -> t3x2.micro, t3x3.micro, ...) so type names stay unique
+    """
+    scaled = list(instances)
+    for copy in range(2, factor + 1):
+        for instance in instances:
+            prefix, _, size = instance['instance_type'].partition('.')
+            clone = dict(instance)
+            clone['instance_type'] = f'{prefix}x{copy}.{size}'
+            scaled.append(clone)
+    return scaled
@@ -0,0 +1,227 @@
+"""
+Benchmark harness for the pricing API
+
+Serves a catalog fixture from a local stand-in for the upstream
+instances.json URL, starts the API with uvicorn pointed at it, drives every
+endpoint at a fixed concurrency and reports throughput, p50/p99 latency and
+server RSS. Repeat for several catalog sizes to see how each endpoint scales.
+
+Usage:
+    python bench/run.py                          # synthetic catalog, 1x and 10x
+    python bench/run.py --scales 1,10,100 --concurrency 32
+    python bench/run.py --fixture instances.json --json bench_output.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from catalog import load_catalog, scale_catalog, synthetic_catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def serve_fixture(payload):
+    """Serve payload at /instances.json from a background thread; returns (server, url)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/instances.json'
+
+
+def start_api(upstream_url, port):
+    """Start the API under uvicorn and wait until it answers"""
+    env = dict(os.environ, EC2_INSTANCES_API=upstream_url)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.index:app',
+         '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT,
+        env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/', timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('API did not start')
+
+
+def rss_mb(pid):
+    """Resident set size of a process in MB (Linux only, None elsewhere)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+def endpoint_queries(instances, rnd):
+    """Query generators per endpoint, sampling instance types and regions from the catalog"""
+    types = [i['instance_type'] for i in instances]
+    regions = sorted({r for i in instances for r in i.get('pricing', {})})
+    families = sorted({t.split('.')[0] for t in types})
+
+    return {
+        '/get-price': lambda: {
+            'instance_type': rnd.choice(types),
+            'region': rnd.choice(regions),
+            'pricing_type': rnd.choice(['ondemand', 'reserved'])
+        },
+        '/search': lambda: {
+            'region': rnd.choice(regions),
+            'min_vcpus': rnd.choice([2, 4, 8]),
+            'max_price': rnd.choice([0.1, 0.5, 2.0]),
+            'limit': 50
+        },
+        '/cheapest': lambda: {
+            'region': rnd.choice(regions),
+            'min_vcpus': rnd.choice([2, 4, 8]),
+            'min_memory': rnd.choice([4, 8, 16]),
+            'family': rnd.choice([None, rnd.choice(families)]) or '',
+            'limit': 10
+        },
+        '/compare': lambda: {
+            'instances': ','.join(rnd.sample(types, min(5, len(types)))),
+            'region': rnd.choice(regions)
+        },
+        '/instances': lambda: {'region': rnd.choice(regions)},
+        '/regions': lambda: {},
+        '/families': lambda: {},
+    }
+
+
+async def drive(base_url, path, make_params, requests, concurrency):
+    """Issue requests against one endpoint with a fixed number of workers"""
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                params = {k: v for k, v in make_params().items() if v != ''}
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, params=params)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'throughput_rps': round(requests / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+    }
+
+
+def run_scale(base_instances, scale, args):
+    """Benchmark every endpoint against the catalog scaled by `scale`"""
+    instances = scale_catalog(base_instances, scale)
+    payload = json.dumps(instances).encode()
+    server, upstream_url = serve_fixture(payload)
+    port = free_port()
+    process = start_api(upstream_url, port)
+    base_url = f'http://127.0.0.1:{port}'
+
+    try:
+        # Load the catalog once so the first endpoint does not pay for the download
+        httpx.get(f'{base_url}/regions', timeout=300.0)
+        report = {
+            'scale': scale,
+            'records': len(instances),
+            'payload_mb': round(len(payload) / 1e6, 2),
+            'rss_mb_loaded': rss_mb(process.pid),
+            'endpoints': {}
+        }
+        rnd = random.Random(args.seed)
+        for path, make_params in endpoint_queries(instances, rnd).items():
+            if args.endpoints and path not in args.endpoints:
+                continue
+            result = asyncio.run(drive(base_url, path, make_params, args.requests, args.concurrency))
+            result['rss_mb'] = rss_mb(process.pid)
+            report['endpoints'][path] = result
+        return report
+    finally:
+        process.terminate()
+        process.wait()
+        server.shutdown()
+
+
+def print_report(report):
+    print(f"\nscale {report['scale']}x: {report['records']} records, "
+          f"{report['payload_mb']} MB catalog, RSS after load {report['rss_mb_loaded']} MB")
+    print(f"{'endpoint':<12} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'RSS MB':>8}")
+    for path, r in report['endpoints'].items():
+        rss = f"{r['rss_mb']:.0f}" if r['rss_mb'] is not None else 'n/a'
+        print(f"{path:<12} {r['throughput_rps']:>9} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['errors']:>7} {rss:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixture', help='Recorded instances.json to serve (default: synthetic catalog)')
+    parser.add_argument('--scales', default='1,10', help='Comma-separated catalog size multipliers (default: 1,10)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients per endpoint (default: 16)')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint (default: 200)')
+    parser.add_argument('--endpoints', help='Comma-separated subset of endpoints to run')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic catalog and query mix')
+    parser.add_argument('--json', help='Also write the results to this file as JSON')
+    args = parser.parse_args()
+    args.endpoints = args.endpoints.split(',') if args.endpoints else None
+
+    base = load_catalog(args.fixture) if args.fixture else synthetic_catalog(seed=args.seed)
+    reports = []
+    for scale in (int(s) for s in args.scales.split(',')):
+        report = run_scale(base, scale, args)
+        print_report(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
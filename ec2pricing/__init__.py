@@ -0,0 +1,68 @@
+"""
+EC2 pricing lookups without the HTTP API
+
+Framework-free core shared with api/index.py. Importing it reads no data;
+a Catalog loads its instances.json on the first lookup.
+
+    from ec2pricing import Catalog
+    catalog = Catalog('instances.json')
+    catalog.price('t3.micro', 'us-east-1', pricing_type='reserved', ri_term='3yr')
+"""
+
+from .catalog import Catalog, default_catalog, get_price, get_price_details
+from .estimate import CostEstimator, InventoryError, InventoryReader, parse_inventory
+from .export import (
+    EXPORT_FORMATS,
+    build_export,
+    compress_export,
+    export_csv,
+    export_encodings,
+    export_parquet,
+    pricing_matrix,
+)
+from .index import InstanceIndex, PrefixIndex, SortedColumn, iter_bitmap, network_gbps, to_bitmap
+from .pricing import (
+    get_pricing_details,
+    get_reserved_instance_option,
+    get_reserved_instance_price,
+    get_spot_instance_price,
+    get_spot_risk,
+    parse_number,
+    reserved_option_from_key,
+    reserved_option_key,
+)
+from .snapshot import Snapshot, SnapshotStore
+
+__all__ = [
+    "Catalog",
+    "default_catalog",
+    "get_price",
+    "get_price_details",
+    "CostEstimator",
+    "InventoryError",
+    "InventoryReader",
+    "parse_inventory",
+    "EXPORT_FORMATS",
+    "build_export",
+    "compress_export",
+    "export_csv",
+    "export_encodings",
+    "export_parquet",
+    "pricing_matrix",
+    "InstanceIndex",
+    "PrefixIndex",
+    "SortedColumn",
+    "iter_bitmap",
+    "network_gbps",
+    "to_bitmap",
+    "get_pricing_details",
+    "get_reserved_instance_option",
+    "get_reserved_instance_price",
+    "get_spot_instance_price",
+    "get_spot_risk",
+    "parse_number",
+    "reserved_option_from_key",
+    "reserved_option_key",
+    "Snapshot",
+    "SnapshotStore",
+]
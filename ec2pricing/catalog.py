@@ -0,0 +1,175 @@
+"""
+Lazily loaded local catalog snapshot
+
+A Catalog points at an instances.json file (or wraps an already loaded list)
+and only reads and indexes it on the first lookup. Lookups are plain
+function calls using the same rules as the HTTP API.
+"""
+
+import json
+import os
+import threading
+
+from .export import build_export, compress_export
+from .index import InstanceIndex, iter_bitmap
+from .pricing import get_pricing_details
+
+
+class Catalog:
+    """
+    Instance catalog loaded on first use
+
+    Usage:
+        catalog = Catalog('instances.json')        # nothing is read yet
+        catalog.price('t3.micro', 'us-east-1')     # loads and indexes once
+    """
+
+    def __init__(self, path=None, instances=None):
+        if path is None and instances is None:
+            raise ValueError("Catalog needs a path or a list of instances")
+        self.path = path
+        self._instances = instances
+        self._index = None
+        self._prices = {}
+        self._exports = {}
+        self._lock = threading.Lock()
+        self._export_locks = {}
+
+    @classmethod
+    def from_instances(cls, instances):
+        """Wrap an already loaded instance list"""
+        return cls(instances=instances)
+
+    @property
+    def index(self):
+        """The InstanceIndex for this catalog, built on first access"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    if self._instances is None:
+                        with open(self.path) as f:
+                            self._instances = json.load(f)
+                    self._index = InstanceIndex(self._instances)
+        return self._index
+
+    @property
+    def instances(self):
+        return self.index.instances
+
+    def instance(self, instance_type):
+        """Catalog record for an instance type (case-insensitive), or None"""
+        return self.index.get(instance_type)
+
+    def os_pricing(self, instance_type, region, os_type='linux'):
+        """Per-OS pricing dictionary for an instance in a region ({} if unavailable)"""
+        instance = self.index.get(instance_type)
+        if instance is None:
+            return {}
+        return instance.get('pricing', {}).get(region, {}).get(os_type.lower(), {})
+
+    def pricing_details(self, instance_type, region, os_type='linux', pricing_type='ondemand',
+                        ri_term=None, ri_payment=None, ri_type=None, spot_type='avg'):
+        """
+        Same result as get_pricing_details for one instance/region/OS
+
+        Returns: dict with price and pricing_info, or None
+        """
+        return get_pricing_details(
+            self.os_pricing(instance_type, region, os_type),
+            pricing_type,
+            ri_term,
+            ri_payment,
+            ri_type,
+            spot_type
+        )
+
+    def price(self, instance_type, region, os_type='linux', pricing_type='ondemand',
+              ri_term=None, ri_payment=None, ri_type=None, spot_type='avg'):
+        """
+        Hourly price as a float, or None if not available
+
+        Results are memoized, so repeated rows in a batch cost one dict lookup.
+        """
+        key = (instance_type, region, os_type, pricing_type, ri_term, ri_payment, ri_type, spot_type)
+        if key not in self._prices:
+            details = self.pricing_details(*key)
+            self._prices[key] = details.get('price') if details else None
+        return self._prices[key]
+
+    def search(self, region, os_type='linux', limit=None, **filters):
+        """
+        Instances matching InstanceIndex.select filters, in catalog order
+
+        Parameters:
+        - region, os_type: pricing context
+        - limit: maximum number of instances (default: all)
+        - filters: family, processor, arch, has_storage, ranges, ri_options
+        """
+        results = []
+        for position in iter_bitmap(self.index.select(region, os_type, **filters)):
+            if limit is not None and len(results) >= limit:
+                break
+            results.append(self.index.instances[position])
+        return results
+
+    def suggest(self, instance_type, limit=5):
+        """Nearest instance type names for a misspelled type"""
+        return self.index.suggest(instance_type, limit=limit)
+
+    def export(self, export_format='csv', encoding='identity'):
+        """
+        Full pricing matrix in 'csv', 'parquet' or 'arrow' format
+
+        Each format is built once per catalog, and each compressed variant
+        once the first time it is asked for (see export.build_export). Every
+        format and encoding has its own lock, so a slow build never holds
+        up the others; later callers get the stored result.
+
+        Returns: the export dict, with bodies[encoding] present
+        """
+        export = self._exports.get(export_format)
+        if export is None:
+            with self._export_lock(export_format):
+                export = self._exports.get(export_format)
+                if export is None:
+                    export = self._exports[export_format] = build_export(self.instances, export_format)
+
+        bodies = export['bodies']
+        if encoding not in bodies:
+            if encoding not in export['encodings']:
+                raise ValueError(f"'{export_format}' export is not available as '{encoding}'")
+            with self._export_lock((export_format, encoding)):
+                if encoding not in bodies:
+                    bodies[encoding] = compress_export(bodies['identity'], encoding)
+        return export
+
+    def _export_lock(self, key):
+        # setdefault is atomic, so concurrent callers always share one lock per key
+        return self._export_locks.setdefault(key, threading.Lock())
+
+
+# Default catalog for the module-level helpers, read from EC2_CATALOG_PATH
+_default = {"catalog": None}
+
+
+def default_catalog():
+    """Catalog at $EC2_CATALOG_PATH (default: ./instances.json), created on first use"""
+    if _default["catalog"] is None:
+        _default["catalog"] = Catalog(os.environ.get("EC2_CATALOG_PATH", "instances.json"))
+    return _default["catalog"]
+
+
+def get_price(instance_type, region, os_type='linux', pricing_type='ondemand',
+              ri_term=None, ri_payment=None, ri_type=None, spot_type='avg'):
+    """Hourly price from the default catalog (see Catalog.price)"""
+    return default_catalog().price(
+        instance_type, region, os_type, pricing_type, ri_term, ri_payment, ri_type, spot_type
+    )
+
+
+def get_price_details(instance_type, region, os_type='linux', pricing_type='ondemand',
+                      ri_term=None, ri_payment=None, ri_type=None, spot_type='avg'):
+    """Pricing details from the default catalog (see Catalog.pricing_details)"""
+    return default_catalog().pricing_details(
+        instance_type, region, os_type, pricing_type, ri_term, ri_payment, ri_type, spot_type
+    )
@@ -0,0 +1,303 @@
+"""
+Bulk cost estimation for fleet inventories
+
+Prices inventory rows (instance_type, region, os, count, hours) one at a
+time against a single catalog, with the same rules as get_pricing_details,
+and keeps running totals by region, family and pricing model. Rows are
+parsed from an iterable of text lines and never collected, so memory is
+bounded by the number of distinct totals keys, not by the inventory size.
+"""
+
+import csv
+import json
+
+from .pricing import get_pricing_details, reserved_option_from_key, reserved_option_key
+
+INVENTORY_FORMATS = ('csv', 'ndjson')
+HOURS_PER_MONTH = 730
+
+# Row fields that may be given per row or as defaults for the whole upload
+PRICING_FIELDS = ('os', 'pricing_type', 'ri_term', 'ri_payment', 'ri_type', 'spot_type')
+
+
+class InventoryError(ValueError):
+    """A row that cannot be parsed or priced; carries its 1-based line number"""
+
+    def __init__(self, line, detail):
+        super().__init__(detail)
+        self.line = line
+        self.detail = detail
+
+
+def detect_format(first_line):
+    """'ndjson' if the first non-empty line is a JSON object, else 'csv'"""
+    return 'ndjson' if first_line.lstrip().startswith('{') else 'csv'
+
+
+class InventoryReader:
+    """
+    Incremental inventory parser: feed it one line at a time
+
+    The format is fixed by the first non-empty line ('ndjson' if it is a
+    JSON object, else 'csv' with that line as the header) unless given.
+    Each record must fit on one line.
+    """
+
+    def __init__(self, inventory_format=None):
+        if inventory_format is not None and inventory_format not in INVENTORY_FORMATS:
+            raise ValueError(f"Unknown inventory format '{inventory_format}'")
+        self.format = inventory_format
+        self.header = None
+        self.lines = 0
+
+    def read(self, line):
+        """
+        Parse the next line
+
+        Returns: (line_number, row dict), (line_number, InventoryError) for a
+        row that cannot be read, or None for blank and header lines
+        """
+        self.lines += 1
+        number = self.lines
+        if not line.strip():
+            return None
+        if self.format is None:
+            self.format = detect_format(line)
+
+        if self.format == 'ndjson':
+            return number, _ndjson_row(number, line)
+
+        values = next(csv.reader([line]), [])
+        if self.header is None:
+            self.header = [name.strip().lower() for name in values]
+            return None
+        if len(values) > len(self.header):
+            return number, InventoryError(number, f"Expected {len(self.header)} columns, got {len(values)}")
+        return number, dict(zip(self.header, (value.strip() for value in values)))
+
+    def skip(self, detail):
+        """
+        Count a line that cannot be read at all (e.g. too long to buffer)
+
+        Returns: (line_number, InventoryError)
+        """
+        self.lines += 1
+        return self.lines, InventoryError(self.lines, detail)
+
+
+def parse_inventory(lines, inventory_format=None):
+    """
+    Parse inventory rows lazily from text lines (see InventoryReader)
+
+    Parameters:
+    - lines: iterable of text lines (a file object, a list, a generator)
+    - inventory_format: 'csv' (header row required), 'ndjson' or None to detect
+
+    Yields: (line_number, row dict) or (line_number, InventoryError)
+    """
+    reader = InventoryReader(inventory_format)
+    for line in lines:
+        parsed = reader.read(line)
+        if parsed is not None:
+            yield parsed
+
+
+def _ndjson_row(number, line):
+    try:
+        row = json.loads(line)
+    except ValueError as e:
+        return InventoryError(number, f"Invalid JSON: {e}")
+    if not isinstance(row, dict):
+        return InventoryError(number, "Each line must be a JSON object")
+    return row
+
+
+class CostEstimator:
+    """
+    Prices inventory rows against one catalog and accumulates totals
+
+    Usage:
+        estimator = CostEstimator(catalog, pricing_type='reserved', ri_term='3yr')
+        for number, row in parse_inventory(open('fleet.csv')):
+            result = estimator.add(number, row)
+        estimator.totals()
+    """
+
+    def __init__(self, catalog, hours=HOURS_PER_MONTH, **defaults):
+        self.catalog = catalog
+        self.hours = hours
+        self.defaults = {
+            'os': 'linux',
+            'pricing_type': 'ondemand',
+            'ri_term': None,
+            'ri_payment': None,
+            'ri_type': None,
+            'spot_type': 'avg'
+        }
+        self.defaults.update({key: value for key, value in defaults.items() if value is not None})
+        self.rows = 0
+        self.priced = 0
+        self.errors = 0
+        self.instances = 0
+        self.hourly = 0.0
+        self.total = 0.0
+        self.by_region = {}
+        self.by_family = {}
+        self.by_pricing_model = {}
+
+    def add(self, number, row):
+        """
+        Price one parsed row (or record an InventoryError from parse_inventory)
+
+        Returns: result dict for the row, or an InventoryError
+        """
+        self.rows += 1
+        try:
+            if isinstance(row, InventoryError):
+                raise row
+            result = self.price_row(number, row)
+        except InventoryError as error:
+            self.errors += 1
+            return error
+
+        self.priced += 1
+        self.instances += result['count']
+        self.hourly += result['hourly_cost']
+        self.total += result['cost']
+        for totals, key in ((self.by_region, result['region']),
+                            (self.by_family, result['family']),
+                            (self.by_pricing_model, result['pricing_model'])):
+            entry = totals.get(key)
+            if entry is None:
+                entry = totals[key] = {'rows': 0, 'instances': 0, 'hourly_cost': 0.0, 'cost': 0.0}
+            entry['rows'] += 1
+            entry['instances'] += result['count']
+            entry['hourly_cost'] += result['hourly_cost']
+            entry['cost'] += result['cost']
+        return result
+
+    def price_row(self, number, row):
+        """Cost of one row; raises InventoryError if it cannot be priced"""
+        options = {key: _field(row, key) or self.defaults[key] for key in PRICING_FIELDS}
+        if not _field(row, 'os'):
+            options['os'] = _field(row, 'os_type') or options['os']
+        instance_type = _field(row, 'instance_type')
+        region = _field(row, 'region')
+        if not instance_type or not region:
+            raise InventoryError(number, "instance_type and region are required")
+
+        count = _quantity(number, row, 'count', 1)
+        hours = _quantity(number, row, 'hours', self.hours)
+
+        instance = self.catalog.instance(instance_type)
+        if instance is None:
+            detail = f"Instance type '{instance_type}' not found"
+            suggestions = self.catalog.suggest(instance_type, limit=3)
+            if suggestions:
+                detail += f". Did you mean: {', '.join(suggestions)}?"
+            raise InventoryError(number, detail)
+
+        region_data = instance.get('pricing', {}).get(region)
+        if not region_data:
+            raise InventoryError(number, f"Instance type '{instance_type}' not available in region '{region}'")
+
+        pricing_type = options['pricing_type'].lower()
+        details = get_pricing_details(
+            region_data.get(options['os'].lower(), {}),
+            pricing_type,
+            options['ri_term'],
+            options['ri_payment'],
+            options['ri_type'],
+            options['spot_type']
+        )
+        if not details or details.get('price') is None:
+            raise InventoryError(
+                number,
+                f"Pricing type '{pricing_type}' not available for '{instance_type}' "
+                f"in '{region}' ({options['os']})"
+            )
+
+        canonical = instance.get('instance_type')
+        price = details['price']
+        return {
+            'line': number,
+            'instance_type': canonical,
+            'family': canonical.split('.')[0],
+            'region': region,
+            'os': options['os'].lower(),
+            'pricing_model': pricing_model(pricing_type, details),
+            'count': count,
+            'hours': hours,
+            'price': price,
+            'hourly_cost': price * count,
+            'cost': price * count * hours
+        }
+
+    def totals(self):
+        """Running totals, rounded to cents (hourly values to 6 decimals)"""
+        return {
+            'rows': self.rows,
+            'priced': self.priced,
+            'errors': self.errors,
+            'instances': self.instances,
+            'hourly_cost': round(self.hourly, 6),
+            'cost': round(self.total, 2),
+            'by_region': _rounded(self.by_region),
+            'by_family': _rounded(self.by_family),
+            'by_pricing_model': _rounded(self.by_pricing_model),
+            'currency': 'USD'
+        }
+
+
+def pricing_model(pricing_type, details):
+    """
+    Totals key for the price actually used, e.g. 'ondemand', 'spot/avg' or
+    'reserved/3yr/allUpfront/Standard'
+
+    Built from details['pricing_info'] (get_pricing_details), so a row whose
+    requested spot type or RI option fell back to another one is counted
+    under the option that priced it.
+    """
+    info = details.get('pricing_info', {})
+    if pricing_type == 'reserved':
+        option = reserved_option_from_key(info.get('option'))
+        if option is None:
+            return f"reserved/{info.get('option')}"
+        return '/'.join(('reserved',) + reserved_option_key(*option))
+    if pricing_type == 'spot':
+        spot_type = str(info.get('spot_type', 'avg')).lower()
+        return f"spot/{spot_type if spot_type in ('min', 'max') else 'avg'}"
+    return pricing_type
+
+
+def _field(row, key):
+    value = row.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _quantity(number, row, key, default):
+    value = _field(row, key)
+    if value is None:
+        return default
+    try:
+        quantity = float(value)
+    except ValueError:
+        quantity = None
+    if quantity is None or not 0 <= quantity < float('inf'):
+        raise InventoryError(number, f"Invalid {key} '{value}'")
+    return int(quantity) if quantity.is_integer() else quantity
+
+
+def _rounded(totals):
+    return {
+        key: {
+            'rows': entry['rows'],
+            'instances': entry['instances'],
+            'hourly_cost': round(entry['hourly_cost'], 6),
+            'cost': round(entry['cost'], 2)
+        }
+        for key, entry in sorted(totals.items())
+    }
@@ -0,0 +1,176 @@
+"""
+Full pricing matrix export
+
+Flattens a catalog into one row per (instance type, region, OS) with every
+on-demand, spot and Reserved Instance price, and encodes it as CSV (with
+gzip and brotli variants, compressed on demand), Parquet or Arrow.
+
+Parquet/Arrow need pyarrow and the brotli variant needs brotli; both are
+imported only when used, so the rest of the package stays dependency-free.
+"""
+
+import csv
+import gzip
+import hashlib
+import importlib.util
+import io
+
+from .pricing import parse_number
+
+SPEC_COLUMNS = ['instance_type', 'family', 'vcpus', 'memory', 'gpus', 'region', 'os']
+PRICE_COLUMNS = ['ondemand', 'spot_min', 'spot_max', 'spot_avg', 'pct_interrupt', 'pct_savings_od']
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow')
+}
+
+
+def reserved_columns(instances):
+    """Sorted union of Reserved Instance option keys across the catalog"""
+    keys = set()
+    for instance in instances:
+        for region_data in (instance.get('pricing') or {}).values():
+            for os_pricing in region_data.values():
+                if isinstance(os_pricing, dict):
+                    keys.update(os_pricing.get('reserved') or {})
+    return sorted(keys)
+
+
+def pricing_matrix(instances):
+    """
+    Flatten the catalog into rows
+
+    Returns: (columns, rows) - rows is a generator of lists aligned with columns
+    """
+    ri_keys = reserved_columns(instances)
+    columns = SPEC_COLUMNS + PRICE_COLUMNS + ri_keys
+
+    def rows():
+        for instance in instances:
+            spec = [
+                instance.get('instance_type'),
+                instance.get('family'),
+                parse_number(instance.get('vCPU')),
+                parse_number(instance.get('memory')),
+                parse_number(instance.get('GPU')) or 0
+            ]
+            for region, region_data in sorted((instance.get('pricing') or {}).items()):
+                for os_type, os_pricing in sorted(region_data.items()):
+                    if not isinstance(os_pricing, dict):
+                        continue
+                    reserved = os_pricing.get('reserved') or {}
+                    yield (
+                        spec
+                        + [region, os_type]
+                        + [parse_number(os_pricing.get(key)) for key in PRICE_COLUMNS]
+                        + [parse_number(reserved.get(key)) for key in ri_keys]
+                    )
+
+    return columns, rows()
+
+
+def export_csv(instances):
+    """Pricing matrix as UTF-8 CSV bytes"""
+    columns, rows = pricing_matrix(instances)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Parquet and Arrow exports require pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def export_table(instances):
+    """Pricing matrix as a pyarrow.Table (string spec columns, float64 prices)"""
+    pa = _pyarrow()
+    columns, rows = pricing_matrix(instances)
+    values = [[] for _ in columns]
+    for row in rows:
+        for column, value in zip(values, row):
+            column.append(value)
+    string_columns = {'instance_type', 'family', 'region', 'os'}
+    return pa.table({
+        name: pa.array(column, type=pa.string() if name in string_columns else pa.float64())
+        for name, column in zip(columns, values)
+    })
+
+
+def export_parquet(instances):
+    """Pricing matrix as Parquet bytes (zstd-compressed columns)"""
+    _pyarrow()
+    import pyarrow.parquet as pq
+    buffer = io.BytesIO()
+    pq.write_table(export_table(instances), buffer, compression='zstd')
+    return buffer.getvalue()
+
+
+def export_arrow(instances):
+    """Pricing matrix as an Arrow IPC file"""
+    pa = _pyarrow()
+    table = export_table(instances)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def export_encodings(export_format):
+    """Content encodings an export can be served in ('br' only when brotli is installed)"""
+    if export_format != 'csv':
+        return ('identity',)
+    if importlib.util.find_spec('brotli') is None:
+        return ('identity', 'gzip')
+    return ('identity', 'gzip', 'br')
+
+
+def compress_export(body, encoding):
+    """
+    Compress an export body for one content encoding
+
+    Levels favour build time over the last few percent of size (gzip 6,
+    brotli 5): on a full catalog brotli's top quality takes minutes.
+    """
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == 'br':
+        import brotli
+        return brotli.compress(body, quality=5)
+    raise ValueError(f"Unknown content encoding '{encoding}'")
+
+
+def build_export(instances, export_format):
+    """
+    Encode the catalog in one format, uncompressed
+
+    Returns: dict with media_type, extension, etag (quoted hash of the
+    uncompressed body), encodings (see export_encodings) and bodies
+    ({content_encoding: bytes}, holding only 'identity' until compressed
+    variants are added with compress_export)
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}'")
+    media_type, extension = EXPORT_FORMATS[export_format]
+
+    if export_format == 'csv':
+        body = export_csv(instances)
+    elif export_format == 'parquet':
+        body = export_parquet(instances)
+    else:
+        body = export_arrow(instances)
+
+    return {
+        'media_type': media_type,
+        'extension': extension,
+        'etag': '"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+        'encodings': export_encodings(export_format),
+        'bodies': {'identity': body}
+    }
@@ -0,0 +1,380 @@
+"""
+In-memory indexes over the instance catalog
+
+InstanceIndex is built once per catalog and answers exact lookups, prefix
+(family) filters, nearest-match suggestions and multi-attribute filters.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+
+from .pricing import get_reserved_instance_price, get_spot_risk, parse_number, reserved_option_key
+
+
+class PrefixIndex:
+    """
+    Sorted-array index over string keys
+
+    Answers prefix queries with two binary searches and suggests nearest
+    keys by walking the sorted keys like a trie, so rows of the edit-distance
+    table are shared between keys with a common prefix.
+    """
+
+    def __init__(self, keys):
+        self.keys = sorted(set(k.lower() for k in keys if k))
+
+    def prefix_range(self, prefix):
+        """Return (lo, hi) slice bounds of keys starting with prefix"""
+        prefix = prefix.lower()
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + '\uffff', lo)
+        return lo, hi
+
+    def with_prefix(self, prefix):
+        """Return all keys starting with prefix"""
+        lo, hi = self.prefix_range(prefix)
+        return self.keys[lo:hi]
+
+    def suggest(self, query, limit=5, max_distance=2):
+        """
+        Find keys within max_distance edits of query
+
+        Returns: list of (distance, key) tuples, closest first
+        """
+        query = query.strip().lower()
+        rows = [list(range(len(query) + 1))]
+        previous = ''
+        matches = []
+        keys = self.keys
+        i = 0
+
+        while i < len(keys):
+            key = keys[i]
+            # Keep the rows computed for the prefix shared with the previous key
+            shared = 0
+            for a, b in zip(previous, key):
+                if a != b:
+                    break
+                shared += 1
+            del rows[shared + 1:]
+            previous = key
+
+            for ch in key[len(rows) - 1:]:
+                if min(rows[-1]) > max_distance:
+                    break
+                above = rows[-1]
+                row = [above[0] + 1]
+                for j, qc in enumerate(query, 1):
+                    row.append(min(row[j - 1] + 1, above[j] + 1, above[j - 1] + (qc != ch)))
+                rows.append(row)
+
+            if min(rows[-1]) > max_distance:
+                # No key under this prefix can match: jump past the whole subtree
+                i = bisect_left(keys, key[:len(rows) - 1] + '\uffff', i + 1)
+                continue
+            if len(rows) == len(key) + 1 and rows[-1][-1] <= max_distance:
+                matches.append((rows[-1][-1], key))
+            i += 1
+
+        matches.sort()
+        return matches[:limit]
+
+
+def to_bitmap(positions, size):
+    """Pack catalog positions into an int bitmap (bit i set = position i)"""
+    bits = bytearray((size + 7) // 8)
+    for p in positions:
+        bits[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def iter_bitmap(bitmap):
+    """Yield the set positions of a bitmap in ascending order"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield (byte_index << 3) + low.bit_length() - 1
+            byte ^= low
+
+
+# Named network performance tiers, in Gbps
+NETWORK_TIERS = {
+    'very low': 0.05,
+    'low': 0.1,
+    'low to moderate': 0.3,
+    'moderate': 0.5,
+    'high': 1.0
+}
+
+
+def network_gbps(network_performance):
+    """Convert a network_performance label ('Up to 10 Gigabit', 'Moderate', '4x 100 Gigabit') to Gbps"""
+    if not network_performance:
+        return None
+    text = str(network_performance).strip().lower()
+    if text in NETWORK_TIERS:
+        return NETWORK_TIERS[text]
+    match = re.search(r'(?:(\d+)x\s*)?(\d+(?:\.\d+)?)\s*gigabit', text)
+    if not match:
+        return None
+    return float(match.group(2)) * int(match.group(1) or 1)
+
+
+class SortedColumn:
+    """
+    Sorted (value, position) index over one numeric attribute
+
+    Alongside the sorted values it keeps cumulative bitmaps at regular
+    steps through the sort order (checkpoint i = positions of the i * step
+    smallest values). A range predicate is two binary searches, at most
+    step / 2 positions packed on either side of the nearest checkpoints and
+    one AND NOT, so its cost does not grow with the number of matches.
+    """
+
+    # Number of cumulative checkpoints per column (memory: CHECKPOINTS bits per instance)
+    CHECKPOINTS = 64
+
+    def __init__(self, values, size):
+        present = sorted((v, p) for p, v in enumerate(values) if v is not None)
+        self.size = size
+        self.values = [v for v, _ in present]
+        self.positions = [p for _, p in present]
+        self.missing = to_bitmap((p for p, v in enumerate(values) if v is None), size)
+
+        self.step = max(64, -(-len(self.positions) // self.CHECKPOINTS))
+        self.checkpoints = [0]
+        for start in range(0, len(self.positions), self.step):
+            chunk = to_bitmap(self.positions[start:start + self.step], size)
+            self.checkpoints.append(self.checkpoints[-1] | chunk)
+
+    def prefix(self, rank):
+        """Bitmap of the positions holding the rank smallest values"""
+        index, offset = divmod(rank, self.step)
+        if offset == 0:
+            return self.checkpoints[index]
+        if offset <= self.step // 2 or index + 1 >= len(self.checkpoints):
+            return self.checkpoints[index] | to_bitmap(self.positions[rank - offset:rank], self.size)
+        end = min((index + 1) * self.step, len(self.positions))
+        return self.checkpoints[index + 1] & ~to_bitmap(self.positions[rank:end], self.size)
+
+    def between(self, low=None, high=None):
+        """Bitmap of positions with low <= value <= high (None = unbounded)"""
+        lo = bisect_left(self.values, low) if low is not None else 0
+        hi = bisect_right(self.values, high) if high is not None else len(self.values)
+        if lo >= hi:
+            return 0
+        return self.prefix(hi) & ~self.prefix(lo)
+
+
+class InstanceIndex:
+    """
+    Lookup structures derived from one copy of the instance catalog
+
+    - by_type: exact instance type -> instance
+    - types: prefix index over instance types (family filters, suggestions)
+    - families: prefix index over family prefixes (t3, m5, ...)
+    - columns: sorted indexes over spec attributes (vcpus, memory, gpus, network)
+    - processors / archs / has_storage: bitmaps for categorical attributes
+    - region/OS-dependent columns (price, interrupt, ri_price) are built on
+      first use and kept for the lifetime of the index
+    - spot_rankings: (region, os) -> [(effective_price, position)] sorted
+      cheapest first, precomputed for every region/OS when the index is built
+    """
+
+    # Columns where an instance without a value passes the range filter,
+    # as the original /search loop did
+    LENIENT_COLUMNS = ('vcpus', 'memory')
+
+    def __init__(self, instances):
+        self.instances = instances
+        self.by_type = {}
+        positions = {}
+
+        for position, instance in enumerate(instances):
+            instance_type = instance.get('instance_type')
+            if not instance_type:
+                continue
+            key = instance_type.lower()
+            # First entry with pricing wins, matching the old linear scan
+            if key not in self.by_type or (not self.by_type[key].get('pricing') and instance.get('pricing')):
+                self.by_type[key] = instance
+            positions.setdefault(key, []).append(position)
+
+        self.types = PrefixIndex(positions.keys())
+        self.families = PrefixIndex(k.split('.')[0] for k in positions)
+        # Catalog positions laid out in sorted-key order, parallel to types.keys
+        self._offsets = [0]
+        self._positions = []
+        for key in self.types.keys:
+            self._positions.extend(positions[key])
+            self._offsets.append(len(self._positions))
+
+        size = len(instances)
+        self.all = (1 << size) - 1
+        self.columns = {
+            'vcpus': SortedColumn([parse_number(i.get('vCPU')) for i in instances], size),
+            'memory': SortedColumn([parse_number(i.get('memory')) for i in instances], size),
+            'gpus': SortedColumn([parse_number(i.get('GPU')) or 0 for i in instances], size),
+            'network': SortedColumn([network_gbps(i.get('network_performance')) for i in instances], size)
+        }
+
+        processors = {}
+        archs = {}
+        storage = []
+        for position, instance in enumerate(instances):
+            processor = (instance.get('physical_processor') or '').lower()
+            processors.setdefault(processor, []).append(position)
+            arch = instance.get('arch') or []
+            for name in ([arch] if isinstance(arch, str) else arch):
+                archs.setdefault(name.lower(), []).append(position)
+            if instance.get('storage'):
+                storage.append(position)
+        self.processors = {k: to_bitmap(v, size) for k, v in processors.items()}
+        self.archs = {k: to_bitmap(v, size) for k, v in archs.items()}
+        self.has_storage = to_bitmap(storage, size)
+        self._region_columns = {}
+        self._unpriced = None
+
+        # Every (region, os) with pricing somewhere in the catalog; region
+        # columns are only built (and cached) for these
+        self.pricing_keys = set()
+        spot_rankings = {}
+        for position, instance in enumerate(instances):
+            for region, region_data in (instance.get('pricing') or {}).items():
+                for os_type, os_pricing in region_data.items():
+                    if not isinstance(os_pricing, dict):
+                        continue
+                    self.pricing_keys.add((region, os_type.lower()))
+                    risk = get_spot_risk(os_pricing)
+                    if risk is not None:
+                        spot_rankings.setdefault((region, os_type.lower()), []).append((risk[2], position))
+        for ranking in spot_rankings.values():
+            ranking.sort()
+        self.spot_rankings = spot_rankings
+
+    def get(self, instance_type):
+        """Exact (case-insensitive) instance type lookup"""
+        return self.by_type.get(instance_type.strip().lower())
+
+    def with_prefix(self, prefix):
+        """Return instances whose type starts with prefix, in catalog order"""
+        lo, hi = self.types.prefix_range(prefix)
+        positions = sorted(self._positions[self._offsets[lo]:self._offsets[hi]])
+        return [self.instances[p] for p in positions]
+
+    def family_bitmap(self, prefix):
+        """Bitmap of instances whose type starts with prefix"""
+        lo, hi = self.types.prefix_range(prefix)
+        return to_bitmap(self._positions[self._offsets[lo]:self._offsets[hi]], len(self.instances))
+
+    def column(self, name, region=None, os_type='linux', ri_term=None, ri_payment=None, ri_type=None):
+        """
+        Return the SortedColumn for an attribute
+
+        Spec columns are shared; price, interrupt and ri_price are built per
+        region/OS (and canonical RI option) the first time they are queried.
+        A region/OS without any pricing gets a shared column with no values,
+        so unknown query values never add cache entries.
+        """
+        if name in self.columns:
+            return self.columns[name]
+        if name not in ('price', 'interrupt', 'ri_price'):
+            raise ValueError(f"Unknown column '{name}'")
+
+        if (region, os_type.lower()) not in self.pricing_keys:
+            if self._unpriced is None:
+                self._unpriced = SortedColumn([None] * len(self.instances), len(self.instances))
+            return self._unpriced
+
+        options = reserved_option_key(ri_term, ri_payment, ri_type) if name == 'ri_price' else (None, None, None)
+        ri_term, ri_payment, ri_type = options
+        key = (name, region, os_type.lower()) + options
+        if key not in self._region_columns:
+            values = []
+            for instance in self.instances:
+                os_pricing = instance.get('pricing', {}).get(region, {}).get(os_type.lower(), {})
+                if name == 'price':
+                    values.append(parse_number(os_pricing.get('ondemand')))
+                elif name == 'interrupt':
+                    values.append(parse_number(os_pricing.get('pct_interrupt')))
+                else:
+                    values.append(parse_number(get_reserved_instance_price(os_pricing, ri_term, ri_payment, ri_type)))
+            self._region_columns[key] = SortedColumn(values, len(self.instances))
+        return self._region_columns[key]
+
+    def select(self, region, os_type='linux', family=None, processor=None, arch=None,
+               has_storage=None, ranges=None, ri_options=None):
+        """
+        Evaluate a filter set as a bitmap intersection
+
+        Parameters:
+        - region, os_type: pricing context; only instances with an on-demand price match
+        - family: instance type prefix (e.g. t3)
+        - processor: case-insensitive substring of physical_processor
+        - arch: architecture (x86_64, arm64, ...)
+        - has_storage: True/False for instance storage presence
+        - ranges: {column: (low, high)} with None for an open bound
+        - ri_options: (ri_term, ri_payment, ri_type) for the ri_price column
+
+        Returns: bitmap of matching catalog positions
+        """
+        price = self.column('price', region, os_type)
+        bits = self.all & ~price.missing
+
+        if family:
+            bits &= self.family_bitmap(family)
+        if processor:
+            needle = processor.lower()
+            matched = 0
+            for name, bitmap in self.processors.items():
+                if needle in name:
+                    matched |= bitmap
+            bits &= matched
+        if arch:
+            bits &= self.archs.get(arch.lower(), 0)
+        if has_storage is not None:
+            bits &= self.has_storage if has_storage else ~self.has_storage
+
+        for name, (low, high) in (ranges or {}).items():
+            if not bits:
+                break
+            column = self.column(name, region, os_type, *(ri_options or ()))
+            matched = column.between(low, high)
+            if name in self.LENIENT_COLUMNS:
+                matched |= column.missing
+            bits &= matched
+
+        return bits
+
+    def rank_spot(self, region, os_type, bitmap):
+        """
+        Walk the precomputed spot ranking, keeping positions set in bitmap
+
+        Yields: (effective_price, position), cheapest first
+        """
+        members = bitmap.to_bytes((len(self.instances) + 7) // 8, 'little')
+        for effective_price, position in self.spot_rankings.get((region, os_type.lower()), ()):
+            if members[position >> 3] >> (position & 7) & 1:
+                yield effective_price, position
+
+    def suggest(self, instance_type, limit=5):
+        """Nearest instance type names for a misspelled type"""
+        return [key for _, key in self.types.suggest(instance_type, limit=limit)]
+
+    def suggest_family(self, family, limit=5):
+        """Nearest family names for a misspelled family"""
+        return [key for _, key in self.families.suggest(family, limit=limit)]
+
+    def correct(self, instance_type):
+        """
+        Resolve a misspelled instance type to its unambiguous nearest match
+
+        Returns: (instance, suggestions) - instance is None unless exactly one
+        key sits at the smallest edit distance
+        """
+        matches = self.types.suggest(instance_type)
+        suggestions = [key for _, key in matches]
+        if matches and (len(matches) == 1 or matches[0][0] < matches[1][0]):
+            return self.by_type[matches[0][1]], suggestions
+        return None, suggestions
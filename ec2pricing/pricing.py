@@ -0,0 +1,283 @@
+"""
+Price extraction from instances.vantage.sh pricing records
+
+Each helper takes the per-OS pricing dictionary of one instance in one
+region, e.g. instance['pricing']['us-east-1']['linux'].
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+def parse_number(value):
+    """
+    Read a numeric catalog field that may be a number, a numeric string or
+    a banded string such as '<5%' or '5-10%' (upper bound is used)
+
+    Returns: float or None
+    """
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        numbers = re.findall(r'\d+(?:\.\d+)?', str(value))
+        return float(numbers[-1]) if numbers else None
+
+
+def get_reserved_instance_option(os_pricing, ri_term=None, ri_payment=None, ri_type=None):
+    """
+    Key of the Reserved Instance option that matches term, payment, and type
+    
+    Parameters: as get_reserved_instance_price
+    
+    Returns: reserved key (e.g. 'yrTerm1Standard.noUpfront') or None
+    """
+    reserved = os_pricing.get('reserved', {})
+    
+    if not reserved:
+        return None
+    
+    # If no specific parameters, return first available (backward compatibility)
+    if not ri_term and not ri_payment and not ri_type:
+        return next(iter(reserved))
+    
+    # Build the key pattern
+    term_map = {'1yr': 'yrTerm1', '3yr': 'yrTerm3'}
+    term_prefix = term_map.get(ri_term, 'yrTerm1')
+    
+    type_map = {'Standard': 'Standard', 'Convertible': 'Convertible', 'Savings': 'Savings'}
+    ri_type_name = type_map.get(ri_type, 'Standard')
+    
+    payment_map = {'allUpfront': 'allUpfront', 'partialUpfront': 'partialUpfront', 'noUpfront': 'noUpfront'}
+    payment = payment_map.get(ri_payment, 'noUpfront')
+    
+    # Try to find exact match
+    key = f"{term_prefix}{ri_type_name}.{payment}"
+    if key in reserved:
+        return key
+    
+    # Try variations if exact match not found
+    for k in reserved:
+        if k.startswith(term_prefix) and ri_type_name in k and payment in k:
+            return k
+    
+    # Fallback: return first matching term
+    for k in reserved:
+        if k.startswith(term_prefix):
+            return k
+    
+    return None
+
+
+def get_reserved_instance_price(os_pricing, ri_term=None, ri_payment=None, ri_type=None):
+    """
+    Extract Reserved Instance price based on term, payment, and type
+    
+    Parameters:
+    - os_pricing: OS pricing dictionary
+    - ri_term: '1yr' or '3yr' (optional)
+    - ri_payment: 'allUpfront', 'partialUpfront', 'noUpfront' (optional)
+    - ri_type: 'Standard', 'Convertible', 'Savings' (optional)
+    
+    Returns: price value or None
+    """
+    key = get_reserved_instance_option(os_pricing, ri_term, ri_payment, ri_type)
+    return os_pricing['reserved'][key] if key else None
+
+
+def reserved_option_from_key(key):
+    """
+    (ri_term, ri_payment, ri_type) of a reserved key such as
+    'yrTerm3Convertible.allUpfront', or None if it has another shape
+    """
+    match = re.fullmatch(r'yrTerm(\d+)(\w+)\.(\w+)', key or '')
+    if not match:
+        return None
+    return f'{match.group(1)}yr', match.group(3), match.group(2)
+
+
+def reserved_option_key(ri_term=None, ri_payment=None, ri_type=None):
+    """
+    Canonical (ri_term, ri_payment, ri_type) for a Reserved Instance choice
+
+    Unrecognised values fall back to the same defaults as
+    get_reserved_instance_price, so every spelling that selects the same
+    price maps to the same key. (None, None, None) means "first available".
+    """
+    if not ri_term and not ri_payment and not ri_type:
+        return None, None, None
+    return (
+        ri_term if ri_term in ('1yr', '3yr') else '1yr',
+        ri_payment if ri_payment in ('allUpfront', 'partialUpfront') else 'noUpfront',
+        ri_type if ri_type in ('Convertible', 'Savings') else 'Standard'
+    )
+
+
+def get_spot_instance_price(os_pricing, spot_type='avg'):
+    """
+    Extract Spot Instance price based on type
+    
+    Parameters:
+    - os_pricing: OS pricing dictionary
+    - spot_type: 'min', 'max', or 'avg' (default: 'avg')
+    
+    Returns: price value or None
+    """
+    spot_map = {
+        'min': 'spot_min',
+        'max': 'spot_max',
+        'avg': 'spot_avg'
+    }
+    
+    spot_key = spot_map.get(spot_type.lower(), 'spot_avg')
+    price = os_pricing.get(spot_key)
+    
+    # Return the price even if it's 0 or empty string (but not None)
+    if price is not None and price != '':
+        return price
+    return None
+
+
+# Interruption rate (%) assumed when a spot record has none: the worst
+# published band, so unknown risk never ranks ahead of known low risk
+DEFAULT_INTERRUPT_RATE = 20.0
+
+
+def get_spot_risk(os_pricing):
+    """
+    Risk-adjusted spot cost
+
+    The effective price is the spot price per hour of completed work,
+    assuming work done before an interruption is lost:
+    spot_price / (1 - interruption_rate).
+
+    Returns: (spot_price, interruption_rate, effective_price) or None
+    """
+    price = None
+    for key in ('spot_avg', 'spot_min', 'spot_max'):
+        price = parse_number(os_pricing.get(key))
+        if price is not None:
+            break
+    if price is None:
+        return None
+
+    rate = parse_number(os_pricing.get('pct_interrupt'))
+    if rate is None:
+        rate = DEFAULT_INTERRUPT_RATE
+    lost = min(max(rate, 0.0), 90.0) / 100
+    return price, rate, price / (1 - lost)
+
+
+def get_pricing_details(os_pricing, pricing_type, ri_term=None, ri_payment=None, ri_type=None, spot_type='avg'):
+    """
+    Get pricing details with all options
+    
+    Returns: dict with price and additional info
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if not os_pricing:
+        if debug:
+            logger.debug("get_pricing_details: os_pricing is empty or None")
+        return None
+    
+    if debug:
+        logger.debug("get_pricing_details: pricing_type=%s, os_pricing keys: %s",
+                     pricing_type, list(os_pricing.keys())[:10])
+    
+    if pricing_type.lower() == 'ondemand':
+        price = os_pricing.get('ondemand')
+        return {
+            'price': float(price) if price else None,
+            'pricing_info': {
+                'type': 'On-Demand',
+                'description': 'Pay-as-you-go pricing'
+            }
+        }
+    
+    elif pricing_type.lower() == 'reserved':
+        option = get_reserved_instance_option(os_pricing, ri_term, ri_payment, ri_type)
+        price = os_pricing['reserved'][option] if option else None
+        if price:
+            return {
+                'price': float(price),
+                'pricing_info': {
+                    'type': 'Reserved Instance',
+                    'option': option,
+                    'term': ri_term or '1yr',
+                    'payment': ri_payment or 'noUpfront',
+                    'ri_type': ri_type or 'Standard',
+                    'description': f'{ri_type or "Standard"} RI - {ri_term or "1yr"} - {ri_payment or "noUpfront"}'
+                },
+                'all_ri_options': os_pricing.get('reserved', {})
+            }
+        return None
+    
+    elif pricing_type.lower() == 'spot':
+        # Try to get spot price - check all possible keys
+        spot_map = {
+            'min': 'spot_min',
+            'max': 'spot_max',
+            'avg': 'spot_avg'
+        }
+        spot_key = spot_map.get(spot_type.lower(), 'spot_avg')
+        
+        # Direct check - if key exists, use it
+        if spot_key in os_pricing:
+            price = os_pricing[spot_key]
+        else:
+            price = os_pricing.get(spot_key)
+        
+        # If requested spot type not found, try to get any available spot price
+        if not price or price == '':
+            # Try spot_avg as fallback
+            if 'spot_avg' in os_pricing:
+                price = os_pricing['spot_avg']
+                spot_type = 'avg'
+            # If still None, try any spot key
+            elif not price or price == '':
+                for key in ['spot_avg', 'spot_min', 'spot_max']:
+                    if key in os_pricing and os_pricing[key]:
+                        price = os_pricing[key]
+                        spot_type = 'avg' if key == 'spot_avg' else ('min' if key == 'spot_min' else 'max')
+                        break
+        
+        # Also get all spot-related data
+        spot_min = os_pricing.get('spot_min')
+        spot_max = os_pricing.get('spot_max')
+        spot_avg = os_pricing.get('spot_avg')
+        pct_savings = os_pricing.get('pct_savings_od')
+        pct_interrupt = os_pricing.get('pct_interrupt')
+        
+        if debug:
+            logger.debug("Spot pricing check - price: %r, os_pricing keys: %s",
+                         price, list(os_pricing.keys())[:10])
+        
+        if price and price != '':
+            try:
+                # Convert to float - handle both string and numeric values
+                price_float = float(price)
+                return {
+                    'price': price_float,
+                    'pricing_info': {
+                        'type': 'Spot Instance',
+                        'spot_type': spot_type,
+                        'description': f'Spot pricing ({spot_type})'
+                    },
+                    'spot_details': {
+                        'min': float(spot_min) if spot_min and spot_min != '' else None,
+                        'max': float(spot_max) if spot_max and spot_max != '' else None,
+                        'avg': float(spot_avg) if spot_avg and spot_avg != '' else None,
+                        'savings_vs_ondemand': float(pct_savings) if pct_savings and pct_savings != '' else None,
+                        'interruption_rate': float(pct_interrupt) if pct_interrupt and pct_interrupt != '' else None
+                    }
+                }
+            except (ValueError, TypeError) as e:
+                logger.warning("Error converting spot price to float: %s, price value: %r", e, price)
+                return None
+        
+        return None
+    
+    return None
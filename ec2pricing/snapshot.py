@@ -0,0 +1,88 @@
+"""
+Immutable, versioned catalog snapshots
+
+A refresh never mutates data a reader can see: it publishes a new Snapshot
+and retires the previous one. Readers pin a snapshot for as long as they
+use it; a retired snapshot is dropped from the store once its last reader
+releases it. All bookkeeping is plain attribute updates, meant to be driven
+from a single thread or event loop.
+"""
+
+import itertools
+from datetime import datetime
+
+from .catalog import Catalog
+
+
+class Snapshot(Catalog):
+    """
+    One version of the catalog plus everything derived from it
+
+    The InstanceIndex (and its precomputed rankings and cached columns)
+    belongs to the snapshot, so derived data always matches the version it
+    was built from.
+    """
+
+    def __init__(self, instances, version, fetched_at=None, on_free=None):
+        super().__init__(instances=instances)
+        self.version = version
+        self.fetched_at = fetched_at or datetime.now()
+        self.refs = 0
+        self.retired = False
+        self._on_free = on_free
+
+    def acquire(self):
+        """Pin the snapshot for a reader; returns self"""
+        self.refs += 1
+        return self
+
+    def release(self):
+        """Unpin the snapshot; frees it if it is retired and unused"""
+        self.refs -= 1
+        self._free_if_unused()
+
+    def retire(self):
+        """Mark as superseded; frees it now or when the last reader releases it"""
+        self.retired = True
+        self._free_if_unused()
+
+    def _free_if_unused(self):
+        if self.retired and self.refs <= 0 and self._on_free is not None:
+            on_free, self._on_free = self._on_free, None
+            on_free(self)
+
+
+class SnapshotStore:
+    """
+    Holds the current snapshot and every retired one still pinned by a reader
+
+    - current: snapshot new readers get
+    - live: version -> snapshot for current and pinned retired snapshots
+    """
+
+    def __init__(self):
+        self.current = None
+        self.live = {}
+        self._versions = itertools.count(1)
+
+    def create(self, instances, fetched_at=None):
+        """Wrap freshly loaded instances in a new, not yet published snapshot"""
+        return Snapshot(instances, next(self._versions), fetched_at, on_free=self._free)
+
+    def publish(self, snapshot):
+        """Make snapshot current and retire the previous one"""
+        previous = self.current
+        self.live[snapshot.version] = snapshot
+        self.current = snapshot
+        if previous is not None:
+            previous.retire()
+        return snapshot
+
+    def clear(self):
+        """Retire the current snapshot so the next reader triggers a reload"""
+        previous, self.current = self.current, None
+        if previous is not None:
+            previous.retire()
+
+    def _free(self, snapshot):
+        self.live.pop(snapshot.version, None)
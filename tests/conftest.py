@@ -0,0 +1,62 @@
+"""
+Shared fixtures: a small hand-written catalog for exact assertions, the
+benchmark's synthetic catalog for checks against a naive scan, and an API
+client serving the small catalog
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api.index as api
+from catalog import synthetic_catalog
+
+
+def instance(instance_type, vcpus, memory, pricing, **extra):
+    """Catalog record in the instances.vantage.sh shape"""
+    record = {
+        'instance_type': instance_type,
+        'family': 'General purpose',
+        'vCPU': vcpus,
+        'memory': memory,
+        'pricing': pricing
+    }
+    record.update(extra)
+    return record
+
+
+@pytest.fixture
+def small_catalog():
+    return [
+        instance('t3.micro', 2, 1, {
+            'us-east-1': {
+                'linux': {
+                    'ondemand': '0.0104',
+                    'spot_avg': '0.0035',
+                    'pct_interrupt': '<5%',
+                    'reserved': {'yrTerm1Standard.noUpfront': '0.0065', 'yrTerm3Standard.allUpfront': '0.0042'}
+                },
+                'windows': {'ondemand': '0.0196'}
+            },
+            'eu-west-1': {'linux': {'ondemand': '0.0114'}}
+        }),
+        instance('t3.small', 2, 2, {
+            'us-east-1': {'linux': {'ondemand': '0.0208', 'spot_avg': '0.0070', 'pct_interrupt': '10-15%'}}
+        }),
+        instance('m5.large', 2, 8, {
+            'us-east-1': {'linux': {'ondemand': '0.096', 'spot_avg': '0.040'}}
+        }),
+        instance('c5.xlarge', 4, 8, {})
+    ]
+
+
+@pytest.fixture(scope='session')
+def synthetic():
+    return synthetic_catalog(seed=0)
+
+
+@pytest.fixture
+def client(small_catalog):
+    snapshot = api._snapshots.publish(api._snapshots.create(small_catalog))
+    yield TestClient(api.app)
+    api._snapshots.clear()
+    assert snapshot.refs == 0
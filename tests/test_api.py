@@ -0,0 +1,57 @@
+from prometheus_client import REGISTRY
+
+import api.index as api
+
+PRICE = '/get-price-value?instance_type=t3.micro&region=us-east-1'
+
+
+def latency_count(path, status='200'):
+    return REGISTRY.get_sample_value(
+        'http_request_duration_seconds_count',
+        {'method': 'GET', 'endpoint': path, 'status': status}
+    ) or 0
+
+
+def test_server_timing_only_when_profiled(client):
+    response = client.get(PRICE)
+    assert response.status_code == 200
+    assert 'server-timing' not in response.headers
+    assert response.headers['x-snapshot-version'] == str(api._snapshots.current.version)
+
+    response = client.get(PRICE, headers={'X-Profile': '1'})
+    phases = [entry.split(';')[0] for entry in response.headers['server-timing'].split(', ')]
+    assert 'encode' in phases and phases[-1] == 'total'
+    assert response.headers['x-snapshot-version'] == str(api._snapshots.current.version)
+
+
+def test_slow_request_heap_keeps_the_slowest(monkeypatch):
+    monkeypatch.setitem(api._slow_requests, 'heap', [])
+    monkeypatch.setitem(api._slow_requests, 'size', 3)
+    for total in (5.0, 1.0, 9.0, 3.0, 7.0, 2.0):
+        api.record_slow_request({'path': '/x', 'total_ms': total})
+    assert sorted(total for total, _, _ in api._slow_requests['heap']) == [5.0, 7.0, 9.0]
+
+
+def test_slow_requests_endpoint_is_bounded(client, monkeypatch):
+    monkeypatch.setitem(api._slow_requests, 'heap', [])
+    monkeypatch.setitem(api._slow_requests, 'size', 2)
+    for _ in range(5):
+        client.get(PRICE, headers={'X-Profile': '1'})
+    client.get(PRICE)
+
+    body = client.get('/debug/slow-requests').json()
+    assert body['capacity'] == 2 and body['count'] == 2
+    totals = [record['total_ms'] for record in body['requests']]
+    assert totals == sorted(totals, reverse=True)
+    assert body['requests'][0]['path'] == '/get-price-value'
+    assert 'encode' in body['requests'][0]['phases_ms']
+
+
+def test_latency_labelled_by_route_template(client):
+    matched = latency_count('/get-price-value')
+    unmatched = latency_count('unmatched', '404')
+    client.get(PRICE)
+    client.get('/no-such-endpoint/12345')
+    assert latency_count('/get-price-value') == matched + 1
+    assert latency_count('unmatched', '404') == unmatched + 1
+    assert latency_count('/no-such-endpoint/12345', '404') == 0
@@ -0,0 +1,166 @@
+import io
+import json
+
+import pytest
+
+import api.index as api
+from ec2pricing import Catalog, CostEstimator, InventoryError, InventoryReader, parse_inventory
+
+
+@pytest.fixture
+def estimator(small_catalog):
+    return CostEstimator(Catalog.from_instances(small_catalog))
+
+
+def test_reader_csv_header_blank_lines_and_line_numbers():
+    rows = list(parse_inventory([
+        'Instance_Type, Region ,count\n',
+        '\n',
+        't3.micro,us-east-1,2\n',
+        't3.micro,us-east-1,1,extra\n'
+    ]))
+    assert rows[0] == (3, {'instance_type': 't3.micro', 'region': 'us-east-1', 'count': '2'})
+    number, error = rows[1]
+    assert number == 4 and isinstance(error, InventoryError)
+    assert error.detail == 'Expected 3 columns, got 4'
+
+
+def test_reader_detects_ndjson_and_reports_bad_lines():
+    rows = list(parse_inventory(['{"instance_type": "t3.micro"}', '[1, 2]', '{oops']))
+    assert rows[0] == (1, {'instance_type': 't3.micro'})
+    assert rows[1][1].detail == 'Each line must be a JSON object'
+    assert rows[2][1].detail.startswith('Invalid JSON')
+
+
+def test_reader_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        InventoryReader('xml')
+
+
+def test_reader_skip_counts_the_line():
+    reader = InventoryReader()
+    assert reader.read('instance_type,region') is None
+    assert reader.skip('too long')[0] == 2
+    assert reader.read('t3.micro,us-east-1') == (3, {'instance_type': 't3.micro', 'region': 'us-east-1'})
+
+
+def test_estimate_rows_and_totals(estimator):
+    lines = [
+        'instance_type,region,os,count,hours,pricing_type,ri_term,ri_payment',
+        't3.micro,us-east-1,linux,3,100,,,',
+        'T3.MICRO,us-east-1,,1,,reserved,3yr,allUpfront',
+        'm5.large,us-east-1,linux,2,10,spot,,',
+    ]
+    results = [estimator.add(*parsed) for parsed in parse_inventory(lines)]
+    assert [r['pricing_model'] for r in results] == ['ondemand', 'reserved/3yr/allUpfront/Standard', 'spot/avg']
+    assert results[0]['cost'] == pytest.approx(0.0104 * 3 * 100)
+    assert results[1]['instance_type'] == 't3.micro' and results[1]['hours'] == 730
+
+    totals = estimator.totals()
+    assert (totals['rows'], totals['priced'], totals['errors'], totals['instances']) == (3, 3, 0, 6)
+    assert totals['cost'] == round(0.0104 * 300 + 0.0042 * 730 + 0.040 * 20, 2)
+    assert set(totals['by_family']) == {'t3', 'm5'}
+    assert totals['by_region']['us-east-1']['rows'] == 3
+
+
+@pytest.mark.parametrize('row, detail', [
+    ({'region': 'us-east-1'}, 'instance_type and region are required'),
+    ({'instance_type': 't3.micor', 'region': 'us-east-1'}, "Did you mean: t3.micro"),
+    ({'instance_type': 'c5.xlarge', 'region': 'us-east-1'}, "not available in region 'us-east-1'"),
+    ({'instance_type': 't3.small', 'region': 'us-east-1', 'pricing_type': 'reserved'}, "Pricing type 'reserved' not available"),
+    ({'instance_type': 't3.micro', 'region': 'us-east-1', 'count': '-1'}, "Invalid count '-1'"),
+    ({'instance_type': 't3.micro', 'region': 'us-east-1', 'hours': 'many'}, "Invalid hours 'many'"),
+    ({'instance_type': 't3.micro', 'region': 'us-east-1', 'count': 'inf'}, "Invalid count 'inf'"),
+])
+def test_estimate_error_paths(estimator, row, detail):
+    error = estimator.add(7, row)
+    assert isinstance(error, InventoryError)
+    assert error.line == 7
+    assert detail in error.detail
+    totals = estimator.totals()
+    assert (totals['rows'], totals['priced'], totals['errors'], totals['cost']) == (1, 0, 1, 0)
+
+
+def test_estimate_records_parse_errors(estimator):
+    error = InventoryError(3, 'Invalid JSON')
+    assert estimator.add(3, error) is error
+    assert estimator.totals()['errors'] == 1
+
+
+def test_junk_ri_options_share_one_pricing_model(estimator):
+    for term in ('1yr', 'one year', '12 months'):
+        estimator.add(1, {'instance_type': 't3.micro', 'region': 'us-east-1',
+                          'pricing_type': 'reserved', 'ri_term': term})
+    assert list(estimator.totals()['by_pricing_model']) == ['reserved/1yr/noUpfront/Standard']
+
+
+@pytest.mark.parametrize('row, model', [
+    ({'pricing_type': 'spot', 'spot_type': 'min'}, 'spot/avg'),
+    ({'pricing_type': 'spot', 'spot_type': 'junk'}, 'spot/avg'),
+    ({'pricing_type': 'reserved', 'ri_term': '1yr'}, 'reserved/1yr/noUpfront/Convertible'),
+    ({'pricing_type': 'reserved'}, 'reserved/1yr/noUpfront/Convertible'),
+])
+def test_pricing_model_names_the_price_used(row, model):
+    # Only spot_avg and a Convertible RI exist, so the requests above fall back
+    catalog = Catalog.from_instances([{
+        'instance_type': 'm5.large',
+        'pricing': {'us-east-1': {'linux': {
+            'ondemand': '0.096',
+            'spot_avg': '0.040',
+            'reserved': {'yrTerm1Convertible.noUpfront': '0.07'}
+        }}}
+    }])
+    result = CostEstimator(catalog).add(1, dict(row, instance_type='m5.large', region='us-east-1'))
+    assert result['pricing_model'] == model
+
+
+def records(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_estimate_endpoint_streams_rows_and_totals(client):
+    body = 'instance_type,region,count\nt3.micro,us-east-1,2\nt3.micor,us-east-1,1\n'
+    output = records(client.post('/estimate?hours=10', content=body, headers={'content-type': 'text/csv'}))
+    assert [r['type'] for r in output] == ['row', 'error', 'totals']
+    assert output[0]['cost'] == round(0.0104 * 2 * 10, 2)
+    assert output[1]['line'] == 3
+    assert output[2]['priced'] == 1 and output[2]['truncated'] is False
+
+
+def test_estimate_endpoint_reports_long_line_and_keeps_going(client):
+    body = (
+        'instance_type,region,count\n'
+        + 't3.micro,us-east-1,1\n' * 10
+        + 'x' * (api.MAX_INVENTORY_LINE + 10) + '\n'
+        + 't3.small,us-east-1,1\n'
+    )
+    output = records(client.post('/estimate?include_rows=false', content=body))
+    assert output[0] == {'type': 'error', 'line': 12, 'detail': f'Line longer than {api.MAX_INVENTORY_LINE} bytes'}
+    totals = output[-1]
+    assert (totals['rows'], totals['priced'], totals['errors'], totals['truncated']) == (12, 11, 1, False)
+
+
+def test_spooled_lines_skip_long_line_without_losing_neighbours(monkeypatch):
+    monkeypatch.setattr(api, 'MAX_INVENTORY_LINE', 8)
+    spool = io.BytesIO(b'\xef\xbb\xbfa,b\n' + b'x' * 30 + b'\nshort\nlast')
+    assert list(api.iter_spooled_lines(spool)) == ['a,b\n', None, 'short\n', 'last']
+
+
+def test_estimate_endpoint_rejects_oversized_upload(client, monkeypatch):
+    monkeypatch.setattr(api, 'MAX_INVENTORY_BYTES', 100)
+    body = 'instance_type,region\n' + 't3.micro,us-east-1\n' * 10
+
+    assert client.post('/estimate', content=body).status_code == 413
+
+    # Without a Content-Length the limit is enforced while spooling
+    def chunks():
+        yield body.encode()
+    response = client.post('/estimate', content=chunks())
+    assert response.status_code == 413
+    assert response.json()['detail'] == 'Inventory larger than 100 bytes'
+
+    assert client.post('/estimate', content=body[:100]).status_code == 200
+
+
+def test_estimate_endpoint_rejects_unknown_format(client):
+    assert client.post('/estimate?format=xml', content='x').status_code == 400
@@ -0,0 +1,135 @@
+import csv
+import gzip
+import io
+import sys
+
+import pytest
+
+import api.index as api
+import ec2pricing.catalog as catalog_module
+from ec2pricing import Catalog, pricing_matrix
+
+RI_COLUMNS = ['yrTerm1Standard.noUpfront', 'yrTerm3Standard.allUpfront']
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Count export builds and compressions made through Catalog.export"""
+    counts = {'build': [], 'compress': []}
+    build, compress = catalog_module.build_export, catalog_module.compress_export
+
+    def counting_build(instances, export_format):
+        counts['build'].append(export_format)
+        return build(instances, export_format)
+
+    def counting_compress(body, encoding):
+        counts['compress'].append(encoding)
+        return compress(body, encoding)
+
+    monkeypatch.setattr(catalog_module, 'build_export', counting_build)
+    monkeypatch.setattr(catalog_module, 'compress_export', counting_compress)
+    return counts
+
+
+def test_pricing_matrix_columns_and_rows(small_catalog):
+    columns, rows = pricing_matrix(small_catalog)
+    assert columns[:7] == ['instance_type', 'family', 'vcpus', 'memory', 'gpus', 'region', 'os']
+    assert columns[7:13] == ['ondemand', 'spot_min', 'spot_max', 'spot_avg', 'pct_interrupt', 'pct_savings_od']
+    assert columns[13:] == RI_COLUMNS
+
+    rows = [dict(zip(columns, row)) for row in rows]
+    # One row per (instance, region, OS); c5.xlarge has no pricing
+    assert [(r['instance_type'], r['region'], r['os']) for r in rows] == [
+        ('t3.micro', 'eu-west-1', 'linux'),
+        ('t3.micro', 'us-east-1', 'linux'),
+        ('t3.micro', 'us-east-1', 'windows'),
+        ('t3.small', 'us-east-1', 'linux'),
+        ('m5.large', 'us-east-1', 'linux')
+    ]
+    linux = rows[1]
+    assert linux['ondemand'] == 0.0104 and linux['spot_avg'] == 0.0035 and linux['gpus'] == 0
+    assert linux['yrTerm1Standard.noUpfront'] == 0.0065 and linux['yrTerm3Standard.allUpfront'] == 0.0042
+    assert rows[3]['yrTerm1Standard.noUpfront'] is None
+
+
+def test_catalog_export_builds_each_format_and_encoding_once(small_catalog, builds):
+    brotli = pytest.importorskip('brotli')
+    catalog = Catalog.from_instances(small_catalog)
+    first = catalog.export('csv')
+    assert catalog.export('csv') is first
+    assert builds['build'] == ['csv'] and builds['compress'] == []
+    assert first['bodies'].keys() == {'identity'}
+
+    catalog.export('csv', 'gzip')
+    catalog.export('csv', 'gzip')
+    catalog.export('csv', 'br')
+    assert builds['build'] == ['csv'] and builds['compress'] == ['gzip', 'br']
+    assert gzip.decompress(first['bodies']['gzip']) == first['bodies']['identity']
+    assert brotli.decompress(first['bodies']['br']) == first['bodies']['identity']
+
+    catalog.export('parquet')
+    assert builds['build'] == ['csv', 'parquet']
+
+
+@pytest.mark.parametrize('accept, expected', [
+    (None, 'identity'),
+    ('', 'identity'),
+    ('gzip', 'gzip'),
+    ('gzip, br', 'br'),
+    ('br;q=0, gzip', 'gzip'),
+    ('br;q=0, gzip;q=0', 'identity'),
+    ('*', 'br'),
+    ('*;q=0, gzip', 'gzip'),
+    ('br;q=0, *', 'gzip')
+])
+def test_negotiate_encoding(accept, expected):
+    assert api.negotiate_encoding(accept, ('identity', 'gzip', 'br')) == expected
+
+
+def test_negotiate_encoding_only_offers_available():
+    assert api.negotiate_encoding('br', ('identity', 'gzip')) == 'identity'
+    assert api.negotiate_encoding('gzip, br', ('identity',)) == 'identity'
+
+
+def test_export_csv_and_etag_suffixes(client):
+    pytest.importorskip('brotli')
+    plain = client.get('/export', headers={'Accept-Encoding': 'identity'})
+    assert plain.status_code == 200
+    assert 'content-encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['vary']
+    etag = plain.headers['etag']
+    header = next(csv.reader(io.StringIO(plain.text)))
+    assert header[-2:] == RI_COLUMNS
+
+    for encoding in ('gzip', 'br'):
+        response = client.get('/export', headers={'Accept-Encoding': encoding})
+        assert response.headers['content-encoding'] == encoding
+        assert response.headers['etag'] == f'{etag[:-1]}-{encoding}"'
+        assert response.content == plain.content
+
+
+@pytest.mark.parametrize('encoding', ['identity', 'gzip'])
+def test_export_not_modified_for_strong_and_weak_etags(client, encoding):
+    etag = client.get('/export', headers={'Accept-Encoding': encoding}).headers['etag']
+    for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+        response = client.get('/export', headers={'Accept-Encoding': encoding, 'If-None-Match': if_none_match})
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag and response.content == b''
+
+    response = client.get('/export', headers={'Accept-Encoding': encoding, 'If-None-Match': '"other"'})
+    assert response.status_code == 200
+
+
+def test_export_rejects_unknown_format(client):
+    response = client.get('/export?format=xlsx')
+    assert response.status_code == 400
+    assert 'csv, parquet, arrow' in response.json()['detail']
+
+
+def test_export_without_pyarrow_is_501(client, monkeypatch):
+    # A None entry in sys.modules makes "import pyarrow" raise ImportError
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    response = client.get('/export?format=parquet')
+    assert response.status_code == 501
+    assert 'pyarrow' in response.json()['detail']
+    assert client.get('/export?format=csv').status_code == 200
@@ -0,0 +1,145 @@
+import random
+
+import pytest
+
+from ec2pricing import InstanceIndex, SortedColumn, iter_bitmap, network_gbps, parse_number, to_bitmap
+from ec2pricing.pricing import get_reserved_instance_price, get_spot_risk
+
+RANGE_LIMITS = {
+    'vcpus': (1, 96),
+    'memory': (0.5, 400),
+    'gpus': (0, 4),
+    'network': (0.1, 100),
+    'price': (0, 10),
+    'interrupt': (0, 20),
+    'ri_price': (0, 8)
+}
+
+
+def attribute(instance, name, region, os_type, ri_options):
+    os_pricing = instance.get('pricing', {}).get(region, {}).get(os_type, {})
+    if name == 'vcpus':
+        return parse_number(instance.get('vCPU'))
+    if name == 'memory':
+        return parse_number(instance.get('memory'))
+    if name == 'gpus':
+        return parse_number(instance.get('GPU')) or 0
+    if name == 'network':
+        return network_gbps(instance.get('network_performance'))
+    if name == 'price':
+        return parse_number(os_pricing.get('ondemand'))
+    if name == 'interrupt':
+        return parse_number(os_pricing.get('pct_interrupt'))
+    return parse_number(get_reserved_instance_price(os_pricing, *(ri_options or ())))
+
+
+def naive_select(instances, region, os_type='linux', family=None, processor=None, arch=None,
+                 has_storage=None, ranges=None, ri_options=None):
+    matched = []
+    for position, instance in enumerate(instances):
+        if attribute(instance, 'price', region, os_type, None) is None:
+            continue
+        if family and not instance['instance_type'].lower().startswith(family.lower()):
+            continue
+        if processor and processor.lower() not in (instance.get('physical_processor') or '').lower():
+            continue
+        if arch and arch.lower() not in [a.lower() for a in instance.get('arch') or []]:
+            continue
+        if has_storage is not None and bool(instance.get('storage')) != has_storage:
+            continue
+        keep = True
+        for name, (low, high) in (ranges or {}).items():
+            value = attribute(instance, name, region, os_type, ri_options)
+            if value is None:
+                keep = name in InstanceIndex.LENIENT_COLUMNS
+            else:
+                keep = (low is None or value >= low) and (high is None or value <= high)
+            if not keep:
+                break
+        if keep:
+            matched.append(position)
+    return matched
+
+
+def random_filters(rnd, regions):
+    ranges = {}
+    for name, (low, high) in RANGE_LIMITS.items():
+        if rnd.random() < 0.4:
+            ranges[name] = (rnd.choice([None, rnd.uniform(low, high)]), rnd.choice([None, rnd.uniform(low, high)]))
+    return {
+        'region': rnd.choice(regions + ['xx-nowhere-1']),
+        'os_type': rnd.choice(['linux', 'windows', 'rhel']),
+        'family': rnd.choice([None, 't3', 'm5', 'c', 'r7a']),
+        'processor': rnd.choice([None, 'graviton', 'intel']),
+        'arch': rnd.choice([None, 'arm64', 'x86_64']),
+        'has_storage': rnd.choice([None, True, False]),
+        'ranges': ranges,
+        'ri_options': rnd.choice([None, ('3yr', 'allUpfront', 'Standard'), ('1yr', 'bogus', None)])
+    }
+
+
+def test_sorted_column_between_matches_scan():
+    rnd = random.Random(3)
+    for _ in range(500):
+        size = rnd.randint(0, 300)
+        values = [rnd.choice([None, rnd.randint(0, 40)]) for _ in range(size)]
+        column = SortedColumn(values, size)
+        low = rnd.choice([None, rnd.randint(-5, 45)])
+        high = rnd.choice([None, rnd.randint(-5, 45)])
+        expected = [p for p, v in enumerate(values)
+                    if v is not None and (low is None or v >= low) and (high is None or v <= high)]
+        assert list(iter_bitmap(column.between(low, high))) == expected
+        assert list(iter_bitmap(column.missing)) == [p for p, v in enumerate(values) if v is None]
+
+
+def test_select_matches_naive_scan(synthetic):
+    index = InstanceIndex(synthetic)
+    regions = sorted({r for i in synthetic for r in i.get('pricing', {})})
+    rnd = random.Random(11)
+    for _ in range(200):
+        filters = random_filters(rnd, regions)
+        assert list(iter_bitmap(index.select(**filters))) == naive_select(synthetic, **filters), filters
+
+
+def test_select_small_catalog(small_catalog):
+    index = InstanceIndex(small_catalog)
+
+    def types(bits):
+        return [small_catalog[p]['instance_type'] for p in iter_bitmap(bits)]
+
+    assert types(index.select('us-east-1')) == ['t3.micro', 't3.small', 'm5.large']
+    assert types(index.select('us-east-1', family='t3', ranges={'memory': (2, None)})) == ['t3.small']
+    assert types(index.select('us-east-1', ranges={'price': (None, 0.05), 'interrupt': (None, 10)})) == ['t3.micro']
+    assert types(index.select('eu-west-1', os_type='Linux')) == ['t3.micro']
+    assert index.select('us-east-1', os_type='sles') == 0
+
+
+def test_unknown_region_and_ri_options_do_not_grow_cache(small_catalog):
+    index = InstanceIndex(small_catalog)
+    for i in range(50):
+        assert index.select(f'made-up-{i}', ranges={'price': (0, 1)}) == 0
+        index.select('us-east-1', ranges={'ri_price': (0, 1)}, ri_options=(f'{i}-years', 'junk', None))
+    assert len(index._region_columns) == 2
+
+
+@pytest.mark.parametrize('region, os_type', [('us-east-1', 'linux'), ('eu-west-1', 'windows'), ('nowhere', 'linux')])
+def test_rank_spot_matches_naive_sort(synthetic, region, os_type):
+    index = InstanceIndex(synthetic)
+    rnd = random.Random(5)
+    bitmap = to_bitmap([p for p in range(len(synthetic)) if rnd.random() < 0.5], len(synthetic))
+    members = set(iter_bitmap(bitmap))
+    expected = sorted(
+        (risk[2], position)
+        for position, instance in enumerate(synthetic)
+        if position in members
+        for risk in [get_spot_risk(instance.get('pricing', {}).get(region, {}).get(os_type, {}))]
+        if risk is not None
+    )
+    assert list(index.rank_spot(region, os_type, bitmap)) == expected
+
+
+def test_rank_spot_prefers_low_interruption(small_catalog):
+    index = InstanceIndex(small_catalog)
+    ranked = [small_catalog[p]['instance_type'] for _, p in index.rank_spot('us-east-1', 'linux', index.all)]
+    # m5.large has no interruption data and is charged the worst band (20%)
+    assert ranked == ['t3.micro', 't3.small', 'm5.large']
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from ec2pricing import PrefixIndex
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(current[j - 1] + 1, previous[j] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def naive_suggest(keys, query, limit=5, max_distance=2):
+    query = query.strip().lower()
+    matches = sorted(
+        (levenshtein(query, key), key) for key in sorted(set(k.lower() for k in keys))
+    )
+    return [m for m in matches if m[0] <= max_distance][:limit]
+
+
+def test_prefix_range_and_with_prefix():
+    index = PrefixIndex(['t3.micro', 'T3.small', 't3a.nano', 'm5.large', ''])
+    assert index.with_prefix('t3.') == ['t3.micro', 't3.small']
+    assert index.with_prefix('T3') == ['t3.micro', 't3.small', 't3a.nano']
+    assert index.with_prefix('x') == []
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('t3.micor', [(2, 't3.micro')]),
+    ('t3.mcro', [(1, 't3.micro')]),
+    ('m5.large', [(0, 'm5.large'), (1, 'm5.xlarge')]),
+    ('zzzzzz', []),
+])
+def test_suggest(query, expected):
+    index = PrefixIndex(['t3.micro', 't3.small', 'm5.large', 'm5.xlarge'])
+    assert index.suggest(query) == expected
+
+
+def test_suggest_reuses_rows_after_pruning():
+    # 'xaaaa' is pruned after a few characters; 'xaaab' shares a longer
+    # prefix than the rows computed for it and must resume from those rows
+    keys = ['xaaaa', 'xaaab', 'xab', 'abc', 'abd', 'abdd']
+    index = PrefixIndex(keys)
+    for query in ('abd', 'xab', 'xaaab', 'xa', 'a'):
+        assert index.suggest(query, limit=10) == naive_suggest(keys, query, limit=10)
+
+
+def test_suggest_matches_naive_scan():
+    rnd = random.Random(7)
+    alphabet = 'abc.1'
+    keys = [''.join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 7))) for _ in range(300)]
+    index = PrefixIndex(keys)
+    for _ in range(300):
+        query = ''.join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 7)))
+        max_distance = rnd.randint(0, 3)
+        assert (index.suggest(query, limit=20, max_distance=max_distance)
+                == naive_suggest(keys, query, limit=20, max_distance=max_distance))
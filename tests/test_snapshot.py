@@ -0,0 +1,66 @@
+from ec2pricing import Catalog, Snapshot, SnapshotStore
+
+
+def test_publish_makes_snapshot_current(small_catalog):
+    store = SnapshotStore()
+    first = store.publish(store.create(small_catalog))
+    assert store.current is first
+    assert isinstance(first, Catalog)
+    assert first.price('t3.micro', 'us-east-1') == 0.0104
+
+    second = store.publish(store.create(small_catalog[:1]))
+    assert second.version == first.version + 1
+    assert store.current is second
+    # Nobody had first pinned, so it is freed as soon as it is retired
+    assert first.retired
+    assert store.live == {second.version: second}
+
+
+def test_retired_snapshot_lives_until_last_release(small_catalog):
+    store = SnapshotStore()
+    old = store.publish(store.create(small_catalog))
+    old.acquire()
+    old.acquire()
+
+    new = store.publish(store.create(small_catalog))
+    assert old.retired and old.refs == 2
+    assert set(store.live) == {old.version, new.version}
+    # A pinned reader keeps seeing its own version's data
+    assert old.instance('m5.large') is not None
+
+    old.release()
+    assert old.version in store.live
+    old.release()
+    assert store.live == {new.version: new}
+
+
+def test_release_of_current_snapshot_does_not_free_it(small_catalog):
+    store = SnapshotStore()
+    current = store.publish(store.create(small_catalog))
+    current.acquire()
+    current.release()
+    assert store.live == {current.version: current}
+    assert store.current is current
+
+
+def test_clear_retires_current(small_catalog):
+    store = SnapshotStore()
+    snapshot = store.publish(store.create(small_catalog)).acquire()
+    store.clear()
+    assert store.current is None
+    assert snapshot.version in store.live
+
+    snapshot.release()
+    assert store.live == {}
+
+
+def test_snapshot_is_freed_once(small_catalog):
+    freed = []
+    snapshot = Snapshot(small_catalog, version=1, on_free=freed.append)
+    snapshot.acquire()
+    snapshot.retire()
+    assert freed == []
+    snapshot.release()
+    snapshot.acquire()
+    snapshot.release()
+    assert freed == [snapshot]